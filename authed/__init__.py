@@ -2,14 +2,23 @@
 
 __version__ = "0.2.3"
 
-# Import the main classes for easy access
-from authed.sdk import Authed
-from authed.sdk.channel import Channel
-from authed.sdk.channel.protocol import MessageType
-
 # Expose these classes at the top level
 __all__ = [
     "Authed",
     "Channel",
     "MessageType"
-] 
\ No newline at end of file
+]
+
+def __getattr__(name):
+    # Import the main classes on first access so that lightweight entry
+    # points (e.g. the CLI) don't pay for loading the whole SDK
+    if name == "Authed":
+        from authed.sdk import Authed
+        return Authed
+    if name == "Channel":
+        from authed.sdk.channel import Channel
+        return Channel
+    if name == "MessageType":
+        from authed.sdk.channel.protocol import MessageType
+        return MessageType
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
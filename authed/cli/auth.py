@@ -1,10 +1,14 @@
 """Authentication handler for CLI commands."""
 
+import asyncio
 import httpx
+from functools import partial
 from typing import Dict
 from urllib.parse import urljoin
 from uuid import UUID
 
+from .utils.http import get_session
+
 class CLIAuth:
     """Handles authentication for CLI commands."""
     
@@ -62,15 +66,15 @@ class CLIAuth:
         headers = kwargs.pop('headers', {})
         headers.update(self.get_headers())
         
-        async with httpx.AsyncClient() as client:
-            response = await client.request(
-                method,
-                url,
-                headers=headers,
-                **kwargs
-            )
-            
-            return response 
+        # Go through the CLI's shared client, so consecutive calls (such as
+        # provider then agent registration in `init setup`) reuse one
+        # connection instead of paying a new TCP and TLS handshake each. The
+        # client is synchronous, so the call runs in the default executor.
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            partial(get_session().request, method, url, headers=headers, **kwargs)
+        )
 
     @property
     def list_agents_url(self) -> str:
@@ -79,7 +83,7 @@ class CLIAuth:
 
     def list_agents(self) -> httpx.Response:
         """List all agents for the provider."""
-        response = httpx.get(
+        response = get_session().get(
             self.list_agents_url,
             headers=self.get_headers()
         )
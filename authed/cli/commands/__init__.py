@@ -1,8 +1,4 @@
-"""Command modules for the Authed CLI."""
+"""Command modules for the Authed CLI.
 
-from . import agents
-from . import permissions
-from . import keys
-from . import logs
-from . import init
-from . import providers 
\ No newline at end of file
+Submodules are imported lazily by the top-level CLI group.
+"""
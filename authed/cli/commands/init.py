@@ -1,15 +1,66 @@
 """Initialization and configuration commands."""
 
 import click
-import json
 from pathlib import Path
 from typing import Optional
+from ...core.jsonio import dumps
 from ..utils import async_command
-import requests
+from ..utils.cache import clear_cache, load_config_cached, load_env_cached
+from ..utils.env import update_env
+from ..utils.files import atomic_write_text
+from ..utils.keys import is_pem
 
 CONFIG_DIR = Path.home() / '.authed'
 CONFIG_FILE = CONFIG_DIR / 'config.json'
 
+# Fixed output pieces, styled once at import rather than on every echo
+_STYLE = {
+    'divider': "=" * 60,
+    'interactive_title': click.style("Interactive Configuration", fg="blue", bold=True),
+    'current_title': click.style("Current Configuration", fg="blue", bold=True),
+    'registry_url_prompt': click.style("Registry URL", bold=True),
+    'provider_id_prompt': click.style("Provider ID", bold=True),
+    'provider_secret_prompt': click.style("Provider Secret", bold=True),
+    'update_secret_confirm': click.style("Update provider secret?", fg="yellow", bold=True),
+    'ok': click.style("✓", fg="green", bold=True),
+    'done': click.style("✓", fg="green"),
+    'reuse': click.style("→", fg="blue"),
+    'config_file': click.style(str(CONFIG_FILE), fg="blue"),
+    'without_credentials': click.style("Without credentials", bold=True),
+    'agents_list_example': click.style("   authed agents list", fg="bright_black"),
+    'override_config': click.style("Override saved config", bold=True),
+    'override_example': click.style("   authed --registry-url=URL --provider-id=ID --provider-secret=SECRET agents list", fg="bright_black"),
+    'no_config': click.style("⚠️  No configuration found", fg="yellow", bold=True),
+    'init_config_command': click.style("authed init config", fg="blue", bold=True),
+    'registry_url_label': click.style("Registry URL:", bold=True),
+    'provider_id_label': click.style("Provider ID:", bold=True),
+    'provider_secret_label': click.style("Provider Secret:", bold=True),
+    'agent_id_label': click.style("Agent ID:", bold=True),
+    'environment_label': click.style("Environment:", bold=True),
+    'env_file': click.style(".env", fg="blue"),
+    'not_set': click.style("  Not set", fg="yellow", italic=True),
+    'warning': click.style("⚠️  Warning", fg="yellow", bold=True),
+    'cannot_undo': click.style("This action cannot be undone!", fg="yellow"),
+    'confirm_clear': click.style("Are you sure?", fg="yellow", bold=True),
+    'cancelled': click.style("\nOperation cancelled", fg="bright_black", italic=True),
+    'creating_provider': click.style("Creating unclaimed provider...", fg="blue"),
+    'setup_complete': click.style("✓ Setup Complete!", fg="green", bold=True),
+    'note': click.style("Note:", fg="yellow", bold=True),
+    'register_example': click.style("  authed providers register --name \"Your Name\" --email \"your.email@example.com\"", fg="blue"),
+    'setup_example': click.style("  authed init setup --provider-id \"your-id\" --provider-secret \"your-secret\"", fg="blue"),
+}
+
+def _save_config(config: dict):
+    """Write the CLI config, creating the config directory on first use."""
+    data = dumps(config).decode('utf-8')
+    try:
+        atomic_write_text(CONFIG_FILE, data)
+    except FileNotFoundError:
+        # Only the first save needs the directory created
+        CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(CONFIG_FILE, data)
+    clear_cache()
+
 @click.group(name='init')
 def group():
     """Initialize and configure the CLI."""
@@ -25,25 +76,21 @@ def configure(
     provider_secret: Optional[str] = None
 ):
     """Configure CLI credentials interactively or via arguments."""
-    # Create config directory if it doesn't exist
-    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-    
     # Load existing config if it exists
     config = {}
     if CONFIG_FILE.exists():
-        with CONFIG_FILE.open('r') as f:
-            config = json.load(f)
+        config = dict(load_config_cached(CONFIG_FILE))
     
     # If no arguments provided, use interactive mode
-    if not any([registry_url, provider_id, provider_secret]):
-        click.echo("\n" + "=" * 60)
-        click.echo(click.style("Interactive Configuration", fg="blue", bold=True))
-        click.echo("=" * 60 + "\n")
+    if not (registry_url or provider_id or provider_secret):
+        click.echo("\n" + _STYLE['divider'])
+        click.echo(_STYLE['interactive_title'])
+        click.echo(_STYLE['divider'] + "\n")
         
         # Registry URL
         default_url = config.get('registry_url', '')
         registry_url = click.prompt(
-            click.style("Registry URL", bold=True),
+            _STYLE['registry_url_prompt'],
             default=default_url,
             type=str
         )
@@ -51,7 +98,7 @@ def configure(
         # Provider ID
         default_id = config.get('provider_id', '')
         provider_id = click.prompt(
-            click.style("Provider ID", bold=True),
+            _STYLE['provider_id_prompt'],
             default=default_id,
             type=str
         )
@@ -61,17 +108,17 @@ def configure(
         if default_secret:
             default_display = '*' * len(default_secret)
             click.echo(f"\nCurrent provider secret: {click.style(default_display, fg='bright_black')}")
-            if not click.confirm(click.style("Update provider secret?", fg="yellow", bold=True), default=False):
+            if not click.confirm(_STYLE['update_secret_confirm'], default=False):
                 provider_secret = default_secret
             else:
                 provider_secret = click.prompt(
-                    click.style("Provider Secret", bold=True),
+                    _STYLE['provider_secret_prompt'],
                     hide_input=True,
                     confirmation_prompt=True
                 )
         else:
             provider_secret = click.prompt(
-                click.style("Provider Secret", bold=True),
+                _STYLE['provider_secret_prompt'],
                 hide_input=True,
                 confirmation_prompt=True
             )
@@ -84,84 +131,82 @@ def configure(
     })
     
     # Save config
-    with CONFIG_FILE.open('w') as f:
-        json.dump(config, f, indent=2)
+    _save_config(config)
     
     # Print success message
-    click.echo("\n" + "=" * 60)
-    click.echo(click.style("✓", fg="green", bold=True) + " Configuration saved successfully")
-    click.echo("=" * 60)
-    click.echo(f"\nConfig file: {click.style(str(CONFIG_FILE), fg='blue')}")
+    click.echo("\n" + _STYLE['divider'])
+    click.echo(_STYLE['ok'] + " Configuration saved successfully")
+    click.echo(_STYLE['divider'])
+    click.echo(f"\nConfig file: {_STYLE['config_file']}")
     click.echo("\nYou can now use the CLI in the following ways:")
-    click.echo("\n1. " + click.style("Without credentials", bold=True) + ":")
-    click.echo(click.style("   authed agents list", fg="bright_black"))
-    click.echo("\n2. " + click.style("Override saved config", bold=True) + ":")
-    click.echo(click.style("   authed --registry-url=URL --provider-id=ID --provider-secret=SECRET agents list", fg="bright_black"))
+    click.echo("\n1. " + _STYLE['without_credentials'] + ":")
+    click.echo(_STYLE['agents_list_example'])
+    click.echo("\n2. " + _STYLE['override_config'] + ":")
+    click.echo(_STYLE['override_example'])
     click.echo()
 
 @group.command(name='show')
 def show_config():
     """Show current configuration."""
     if not CONFIG_FILE.exists():
-        click.echo("\n" + click.style("⚠️  No configuration found", fg="yellow", bold=True))
-        click.echo("Run " + click.style("authed init config", fg="blue", bold=True) + " to configure.")
+        click.echo("\n" + _STYLE['no_config'])
+        click.echo("Run " + _STYLE['init_config_command'] + " to configure.")
         click.echo()
         return
     
-    with CONFIG_FILE.open('r') as f:
-        config = json.load(f)
+    config = load_config_cached(CONFIG_FILE)
     
-    click.echo("\n" + "=" * 60)
-    click.echo(click.style("Current Configuration", fg="blue", bold=True))
-    click.echo("=" * 60 + "\n")
+    # Build the whole report and write it at once
+    parts = ["\n", _STYLE['divider'], "\n", _STYLE['current_title'], "\n", _STYLE['divider'], "\n\n"]
     
     # Registry URL
-    click.echo(click.style("Registry URL:", bold=True))
+    parts += [_STYLE['registry_url_label'], "\n"]
     if url := config.get('registry_url'):
-        click.echo(f"  {click.style(url, fg='bright_blue')}")
+        parts += ["  ", click.style(url, fg='bright_blue'), "\n"]
     else:
-        click.echo(click.style("  Not set", fg="yellow", italic=True))
+        parts += [_STYLE['not_set'], "\n"]
     
     # Provider ID
-    click.echo(f"\n{click.style('Provider ID:', bold=True)}")
+    parts += ["\n", _STYLE['provider_id_label'], "\n"]
     if pid := config.get('provider_id'):
-        click.echo(f"  {click.style(pid, fg='magenta')}")
+        parts += ["  ", click.style(pid, fg='magenta'), "\n"]
     else:
-        click.echo(click.style("  Not set", fg="yellow", italic=True))
+        parts += [_STYLE['not_set'], "\n"]
     
     # Provider Secret
-    click.echo(f"\n{click.style('Provider Secret:', bold=True)}")
+    parts += ["\n", _STYLE['provider_secret_label'], "\n"]
     if config.get('provider_secret'):
         secret_display = '*' * len(config['provider_secret'])
-        click.echo(f"  {click.style(secret_display, fg='bright_black')}")
+        parts += ["  ", click.style(secret_display, fg='bright_black'), "\n"]
     else:
-        click.echo(click.style("  Not set", fg="yellow", italic=True))
+        parts += [_STYLE['not_set'], "\n"]
     
-    click.echo(f"\nConfig file: {click.style(str(CONFIG_FILE), fg='blue')}")
-    click.echo()
+    parts += ["\nConfig file: ", _STYLE['config_file'], "\n\n"]
+    click.echo("".join(parts), nl=False)
 
 @group.command(name='clear')
 @click.option('--force', is_flag=True, help='Clear without confirmation')
 def clear_config(force: bool):
     """Clear saved configuration."""
     if not CONFIG_FILE.exists():
-        click.echo("\n" + click.style("⚠️  No configuration found", fg="yellow", bold=True))
+        click.echo("\n" + _STYLE['no_config'])
         click.echo()
         return
     
     if not force:
-        click.echo("\n" + click.style("⚠️  Warning", fg="yellow", bold=True))
+        click.echo("\n" + _STYLE['warning'])
         click.echo("You are about to clear all saved configuration.")
-        click.echo(click.style("This action cannot be undone!", fg="yellow"))
+        click.echo(_STYLE['cannot_undo'])
         click.echo()
         
-        if not click.confirm(click.style("Are you sure?", fg="yellow", bold=True)):
-            click.echo(click.style("\nOperation cancelled", fg="bright_black", italic=True))
+        if not click.confirm(_STYLE['confirm_clear']):
+            click.echo(_STYLE['cancelled'])
             click.echo()
             return
     
     CONFIG_FILE.unlink()
-    click.echo("\n" + click.style("✓", fg="green", bold=True) + " Configuration cleared successfully")
+    clear_cache()
+    click.echo("\n" + _STYLE['ok'] + " Configuration cleared successfully")
     click.echo()
 
 @group.command(name='setup')
@@ -182,38 +227,68 @@ async def setup(ctx, provider_id: Optional[str], provider_secret: Optional[str])
        Run with provider credentials: authed init setup --provider-id "your-id" --provider-secret "your-secret"
        This uses an existing claimed provider with full capabilities.
     """
+    # Load existing env file content
+    env_file = Path('.env')
+    existing_env = {}
+    if env_file.exists():
+        existing_env = dict(load_env_cached(env_file))
+    
+    # Check if we have valid key pair
+    has_valid_keys = (
+        'AUTHED_PRIVATE_KEY' in existing_env and 
+        'AUTHED_PUBLIC_KEY' in existing_env and
+        is_pem(existing_env['AUTHED_PRIVATE_KEY']) and
+        is_pem(existing_env['AUTHED_PUBLIC_KEY'])
+    )
+    
+    # Generate new keys only if needed, in the background while the provider
+    # is registered; keygen is CPU-bound and independent of the network round trip
+    keygen_future = None
+    if not has_valid_keys:
+        from concurrent.futures import ThreadPoolExecutor
+        from ..commands.keys import generate_keypair
+        executor = ThreadPoolExecutor(max_workers=1)
+        keygen_future = executor.submit(generate_keypair)
+        executor.shutdown(wait=False)
+    
     # Create unclaimed provider if credentials not provided
-    if not provider_id or not provider_secret:
-        click.echo("\n" + click.style("Creating unclaimed provider...", fg="blue"))
+    unclaimed = not provider_id or not provider_secret
+    if unclaimed:
+        import httpx
+        from ..utils.http import get_session
+        click.echo("\n" + _STYLE['creating_provider'])
         try:
-            response = requests.post(
+            response = get_session().post(
                 "https://api.getauthed.dev/providers/register",
-                headers={"Content-Type": "application/json"},
                 json={}
             )
             response.raise_for_status()
             result = response.json()
             provider_id = result['id']
             provider_secret = result['provider_secret']
-            click.echo(click.style("✓", fg="green") + " Provider created successfully")
-        except requests.exceptions.RequestException as e:
+            click.echo(_STYLE['done'] + " Provider created successfully")
+        except httpx.HTTPError as e:
             raise click.UsageError(f"Failed to create provider: {str(e)}")
 
     # Save provider config
-    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
     config = {
         'registry_url': 'https://api.getauthed.dev',
         'provider_id': provider_id,
         'provider_secret': provider_secret
     }
-    with CONFIG_FILE.open('w') as f:
-        json.dump(config, f, indent=2)
+    _save_config(config)
 
-    # Generate keys
-    from ..commands.keys import generate_keypair
-    key_pair = generate_keypair()
-    public_key = key_pair.public_key
-    private_key = key_pair.private_key
+    # Pick the keys the agent is registered with
+    if keygen_future is not None:
+        key_pair = keygen_future.result()
+        public_key = key_pair.public_key
+        private_key = key_pair.private_key
+        click.echo(_STYLE['done'] + " Generated new key pair (existing keys were invalid)")
+    else:
+        # Use existing keys
+        public_key = existing_env['AUTHED_PUBLIC_KEY'].strip()
+        private_key = existing_env['AUTHED_PRIVATE_KEY'].strip()
+        click.echo(_STYLE['reuse'] + " Using existing key pair")
 
     # Initialize auth with saved config
     from ..auth import CLIAuth
@@ -241,94 +316,49 @@ async def setup(ctx, provider_id: Optional[str], provider_secret: Optional[str])
     agent_id = result['agent_id']
     agent_secret = result['agent_secret']
 
-    # Create or update .env file
-    env_file = Path('.env')
-    
-    # Load existing env file content
-    existing_env = {}
-    if env_file.exists():
-        with env_file.open('r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    existing_env[key.strip()] = value.strip()
-    
-    # Check if we have valid key pair
-    def is_valid_key(key: str) -> bool:
-        key = key.strip('"\' ')
-        # Basic format check - should have proper PEM headers and content
-        if key.startswith('-----BEGIN') and key.endswith('-----'):
-            # Should have some content between the headers
-            parts = key.split('-----')
-            return len(parts) >= 4 and parts[2].strip()  # Middle part should have content
-        return False
-
-    has_valid_keys = (
-        'AUTHED_PRIVATE_KEY' in existing_env and 
-        'AUTHED_PUBLIC_KEY' in existing_env and
-        is_valid_key(existing_env['AUTHED_PRIVATE_KEY']) and
-        is_valid_key(existing_env['AUTHED_PUBLIC_KEY'])
-    )
-    
-    # Generate new keys if needed
-    if not has_valid_keys:
-        from ..commands.keys import generate_keypair
-        key_pair = generate_keypair()
-        public_key = key_pair.public_key
-        private_key = key_pair.private_key
-        click.echo(click.style("✓", fg="green") + " Generated new key pair (existing keys were invalid)")
-    else:
-        # Use existing keys
-        public_key = existing_env['AUTHED_PUBLIC_KEY'].strip('"\' ')
-        private_key = existing_env['AUTHED_PRIVATE_KEY'].strip('"\' ')
-        click.echo(click.style("→", fg="blue") + " Using existing key pair")
-    
     # Only add new values if they don't exist
     new_env = {
-        'AUTHED_REGISTRY_URL': '"https://api.getauthed.dev"',
-        'AUTHED_PROVIDER_ID': f'"{provider_id}"',
-        'AUTHED_PROVIDER_SECRET': f'"{provider_secret}"',
-        'AUTHED_AGENT_ID': f'"{agent_id}"',
-        'AUTHED_AGENT_SECRET': f'"{agent_secret}"',
-        'AUTHED_PRIVATE_KEY': f'"{private_key}"',
-        'AUTHED_PUBLIC_KEY': f'"{public_key}"'
+        'AUTHED_REGISTRY_URL': 'https://api.getauthed.dev',
+        'AUTHED_PROVIDER_ID': provider_id,
+        'AUTHED_PROVIDER_SECRET': provider_secret,
+        'AUTHED_AGENT_ID': agent_id,
+        'AUTHED_AGENT_SECRET': agent_secret,
+        'AUTHED_PRIVATE_KEY': private_key,
+        'AUTHED_PUBLIC_KEY': public_key
     }
     
     # Update values that don't exist or need updating
-    for key, value in new_env.items():
-        if key not in existing_env or (key in ['AUTHED_PRIVATE_KEY', 'AUTHED_PUBLIC_KEY'] and not has_valid_keys):
-            existing_env[key] = value
+    updates = {
+        key: value for key, value in new_env.items()
+        if key not in existing_env or (key in ['AUTHED_PRIVATE_KEY', 'AUTHED_PUBLIC_KEY'] and not has_valid_keys)
+    }
     
-    # Write back to .env file
-    with env_file.open('w') as f:
-        f.write("# Authed Environment Variables\n\n")
-        # Write non-Authed variables first
-        for key, value in existing_env.items():
-            if not key.startswith('AUTHED_'):
-                f.write(f"{key}={value}\n")
-        # Write Authed variables
-        f.write("\n# Authed Configuration\n")
-        for key, value in existing_env.items():
-            if key.startswith('AUTHED_'):
-                f.write(f"{key}={value}\n")
+    # Write back to .env file, keeping its other lines as they are
+    env_text = env_file.read_text() if env_file.exists() else ""
+    atomic_write_text(env_file, update_env(env_text, updates))
+    clear_cache()
 
-    # Success output
-    click.echo("\n" + "=" * 60)
-    click.echo(click.style("✓ Setup Complete!", fg="green", bold=True))
-    click.echo("=" * 60)
-    click.echo(f"\n{click.style('Provider ID:', bold=True)}     {click.style(provider_id, fg='yellow')}")
-    click.echo(f"{click.style('Provider Secret:', bold=True)}  {click.style(provider_secret, fg='yellow')}")
-    click.echo(f"{click.style('Agent ID:', bold=True)}     {click.style(agent_id, fg='yellow')}")
-    click.echo(f"{click.style('Environment:', bold=True)}  {click.style('.env', fg='blue')} file created with all credentials")
+    # Success output, written at once
+    parts = [
+        "\n", _STYLE['divider'], "\n",
+        _STYLE['setup_complete'], "\n",
+        _STYLE['divider'], "\n",
+        "\n", _STYLE['provider_id_label'], "     ", click.style(provider_id, fg='yellow'), "\n",
+        _STYLE['provider_secret_label'], "  ", click.style(provider_secret, fg='yellow'), "\n",
+        _STYLE['agent_id_label'], "     ", click.style(agent_id, fg='yellow'), "\n",
+        _STYLE['environment_label'], "  ", _STYLE['env_file'], " file created with all credentials\n"
+    ]
     
-    if not provider_id or not provider_secret:
-        click.echo(f"\n{click.style('Note:', fg='yellow', bold=True)} This is an unclaimed provider with limited capabilities:")
-        click.echo("  - Maximum of 3 agents")
-        click.echo("  - No access to logs")
-        click.echo("\nTo claim this provider and get full access, run:")
-        click.echo(click.style("  authed providers register --name \"Your Name\" --email \"your.email@example.com\"", fg="blue"))
-        click.echo("\nThen use the returned provider ID and secret with:")
-        click.echo(click.style("  authed init setup --provider-id \"your-id\" --provider-secret \"your-secret\"", fg="blue"))
+    if unclaimed:
+        parts += [
+            "\n", _STYLE['note'], " This is an unclaimed provider with limited capabilities:\n",
+            "  - Maximum of 3 agents\n",
+            "  - No access to logs\n",
+            "\nTo claim this provider and get full access, run:\n",
+            _STYLE['register_example'], "\n",
+            "\nThen use the returned provider ID and secret with:\n",
+            _STYLE['setup_example'], "\n"
+        ]
     
-    click.echo(f"\n{click.style('Note:', fg='yellow', bold=True)} Add .env to your .gitignore file") 
\ No newline at end of file
+    parts += ["\n", _STYLE['note'], " Add .env to your .gitignore file\n"]
+    click.echo("".join(parts), nl=False)
@@ -4,35 +4,51 @@ import click
 from pathlib import Path
 from typing import Optional
 from ..utils.keys import KeyPair
+from ..utils.cache import clear_cache, load_env_cached
+from ..utils.env import update_env
+from ..utils.files import atomic_write_text
+
+# Fixed output pieces, styled once at import rather than on every echo
+_STYLE = {
+    'divider': "=" * 60,
+    'generated_title': click.style("Generated Keys", fg="blue", bold=True),
+    'public_key_label': click.style("Public Key:", bold=True),
+    'private_key_label': click.style("Private Key:", bold=True) + click.style(" (Keep this secure!)", fg="yellow"),
+    'ok': click.style("✓", fg="green", bold=True),
+    'error': click.style("✗ Error: ", fg="red", bold=True),
+    'fail': click.style("✗", fg="red", bold=True),
+    'note': click.style("Note:", fg="yellow", bold=True),
+}
 
 @click.group(name='keys')
 def group():
     """Manage keys."""
     pass
 
-def generate_keypair():
+def generate_keypair(algorithm: Optional[str] = None):
     """Generate a new key pair and return it."""
-    return KeyPair.generate()
+    return KeyPair.generate(algorithm=algorithm)
 
 @group.command(name='generate')
 @click.option('--output', type=click.Path(dir_okay=False), help='Output file path')
 @click.option('--no-update-env', is_flag=True, help='Do not update .env file with new keys')
+@click.option('--algorithm', type=click.Choice(['rsa', 'ed25519'], case_sensitive=False), help='Key algorithm (default: $AUTHED_KEY_ALG or rsa)')
 @click.pass_context
-def generate_keys(ctx, output: Optional[str], no_update_env: bool):
+def generate_keys(ctx, output: Optional[str], no_update_env: bool, algorithm: Optional[str]):
     """Generate a new keypair."""
     try:
         # Generate new key pair
-        keypair = generate_keypair()
+        keypair = generate_keypair(algorithm)
         
         # Always print the keys to terminal
-        click.echo("\n" + "=" * 60)
-        click.echo(click.style("Generated Keys", fg="blue", bold=True))
-        click.echo("=" * 60 + "\n")
+        click.echo("\n" + _STYLE['divider'])
+        click.echo(_STYLE['generated_title'])
+        click.echo(_STYLE['divider'] + "\n")
         
-        click.echo(click.style("Public Key:", bold=True))
+        click.echo(_STYLE['public_key_label'])
         click.echo(click.style(keypair.public_key, fg="bright_black"))
         
-        click.echo("\n" + click.style("Private Key:", bold=True) + click.style(" (Keep this secure!)", fg="yellow"))
+        click.echo("\n" + _STYLE['private_key_label'])
         click.echo(click.style(keypair.private_key, fg="bright_black"))
         click.echo()
         
@@ -40,58 +56,59 @@ def generate_keys(ctx, output: Optional[str], no_update_env: bool):
             # Save to file
             output_path = Path(output)
             keypair.save(str(output_path))
-            click.echo(click.style("✓", fg="green", bold=True) + f" Keys saved to {click.style(output, fg='blue')}")
+            click.echo(_STYLE['ok'] + f" Keys saved to {click.style(output, fg='blue')}")
             
         if not no_update_env:
-            # Check existing keys in .env
-            env_file = Path('.env')
-            has_valid_keys = False
-            
-            if env_file.exists():
-                with env_file.open('r') as f:
-                    content = f.read()
-                    if 'AUTHED_PRIVATE_KEY' in content and 'AUTHED_PUBLIC_KEY' in content:
-                        # Load existing keys
-                        from dotenv import load_dotenv
-                        import os
-                        load_dotenv()
-                        private_key = os.getenv('AUTHED_PRIVATE_KEY')
-                        public_key = os.getenv('AUTHED_PUBLIC_KEY')
-                        if private_key and public_key:
-                            existing_keypair = KeyPair(public_key.strip('"'), private_key.strip('"'))
-                            has_valid_keys = existing_keypair.is_valid()
-            
             # Load existing .env content
+            env_file = Path('.env')
             existing_env = {}
             if env_file.exists():
-                with env_file.open('r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith('#') and '=' in line:
-                            key, value = line.split('=', 1)
-                            existing_env[key.strip()] = value.strip()
+                existing_env = dict(load_env_cached(env_file))
             
-            # Update keys in .env
-            existing_env['AUTHED_PRIVATE_KEY'] = f'"{keypair.private_key}"'
-            existing_env['AUTHED_PUBLIC_KEY'] = f'"{keypair.public_key}"'
+            # Check existing keys in .env
+            has_valid_keys = False
+            private_key = existing_env.get('AUTHED_PRIVATE_KEY')
+            public_key = existing_env.get('AUTHED_PUBLIC_KEY')
+            if private_key and public_key:
+                has_valid_keys = KeyPair(public_key, private_key).is_valid()
             
-            # Write back to .env file
-            with env_file.open('w') as f:
-                # Write Authed variables
-                f.write("# Authed Configuration\n")
-                for key, value in existing_env.items():
-                    if key.startswith('AUTHED_'):
-                        f.write(f"{key}={value}\n")
+            # Update keys in .env, keeping the file's other lines as they are
+            env_text = env_file.read_text() if env_file.exists() else ""
+            atomic_write_text(env_file, update_env(env_text, {
+                'AUTHED_PRIVATE_KEY': keypair.private_key,
+                'AUTHED_PUBLIC_KEY': keypair.public_key
+            }))
+            clear_cache()
             
             if has_valid_keys:
-                click.echo(click.style("✓", fg="green", bold=True) + " Updated existing keys in .env file")
+                click.echo(_STYLE['ok'] + " Updated existing keys in .env file")
             else:
-                click.echo(click.style("✓", fg="green", bold=True) + " Added new keys to .env file")
+                click.echo(_STYLE['ok'] + " Added new keys to .env file")
             
-        click.echo(f"\n{click.style('Note:', fg='yellow', bold=True)} Add .env to your .gitignore file")
+        click.echo(f"\n{_STYLE['note']} Add .env to your .gitignore file")
             
     except Exception as e:
-        click.echo(click.style("✗ Error: ", fg="red", bold=True) + str(e), err=True)
+        click.echo(_STYLE['error'] + str(e), err=True)
+        ctx.exit(1)
+
+@group.command(name='generate-batch')
+@click.option('--count', type=click.IntRange(min=1), required=True, help='Number of keypairs to generate')
+@click.option('--output-dir', type=click.Path(file_okay=False), required=True, help='Directory to write the key files to')
+@click.option('--algorithm', type=click.Choice(['rsa', 'ed25519'], case_sensitive=False), help='Key algorithm (default: $AUTHED_KEY_ALG or rsa)')
+@click.pass_context
+def generate_batch(ctx, count: int, output_dir: str, algorithm: Optional[str]):
+    """Generate several keypairs in parallel, one JSON file each."""
+    try:
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        
+        keypairs = KeyPair.generate_batch(count, algorithm=algorithm)
+        for i, keypair in enumerate(keypairs, start=1):
+            keypair.save(str(output_path / f'keypair-{i}.json'))
+        
+        click.echo(_STYLE['ok'] + f" {count} key pairs saved to {click.style(output_dir, fg='blue')}")
+    except Exception as e:
+        click.echo(_STYLE['error'] + str(e), err=True)
         ctx.exit(1)
 
 @group.command(name='validate')
@@ -116,16 +133,16 @@ def validate_keys(ctx, key_file: Optional[str]):
             public_key = os.getenv("AUTHED_PUBLIC_KEY")
             
             if not private_key or not public_key:
-                click.echo(click.style("✗", fg="red", bold=True) + " No keys found in .env file")
+                click.echo(_STYLE['fail'] + " No keys found in .env file")
                 ctx.exit(1)
                 
             keypair = KeyPair(public_key, private_key)
             
         if keypair.is_valid():
-            click.echo(click.style("✓", fg="green", bold=True) + " Key pair is valid")
+            click.echo(_STYLE['ok'] + " Key pair is valid")
         else:
-            click.echo(click.style("✗", fg="red", bold=True) + " Invalid key pair")
+            click.echo(_STYLE['fail'] + " Invalid key pair")
             ctx.exit(1)
     except Exception as e:
-        click.echo(click.style("✗ Error: ", fg="red", bold=True) + str(e), err=True)
+        click.echo(_STYLE['error'] + str(e), err=True)
         ctx.exit(1) 
\ No newline at end of file
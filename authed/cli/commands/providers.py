@@ -1,7 +1,6 @@
 """Provider management commands."""
 
 import click
-import requests
 from uuid import UUID
 
 @click.group(name='providers')
@@ -18,6 +17,9 @@ def register(name, email):
     If name and email are provided, the account will be claimed.
     If no credentials are provided, an unclaimed account will be created.
     """
+    import httpx
+    from ..utils.http import get_session
+    
     data = {}
     
     # If name and email are provided, add them to the request
@@ -28,12 +30,11 @@ def register(name, email):
         }
     
     try:
-        response = requests.post(
+        response = get_session().post(
             "https://api.getauthed.dev/providers/register",
-            headers={"Content-Type": "application/json"},
             json=data
         )
         response.raise_for_status()
         click.echo(f"Success! Response: {response.json()}")
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         click.echo(f"Error: {str(e)}", err=True) 
\ No newline at end of file
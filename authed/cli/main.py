@@ -1,11 +1,10 @@
 """Command line interface for Agent Auth."""
 
 import click
-import json
+import importlib
 from pathlib import Path
 from uuid import UUID
-from .commands import agents, permissions, keys, logs, init, providers
-from .auth import CLIAuth
+from .utils.cache import load_config_cached
 
 # Config file location
 CONFIG_DIR = Path.home() / '.authed'
@@ -16,10 +15,40 @@ def load_config():
     if not CONFIG_FILE.exists():
         return {}
     
-    with CONFIG_FILE.open('r') as f:
-        return json.load(f)
+    return dict(load_config_cached(CONFIG_FILE))
 
-@click.group()
+class LazyGroup(click.Group):
+    """Click group that imports command modules on first use.
+    
+    Command modules pull in heavy dependencies (cryptography, requests,
+    websockets), so they are only imported when their command is invoked.
+    """
+    
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Map of command name to module path exposing a `group` attribute
+        self.lazy_commands = lazy_commands or {}
+    
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+    
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_commands and cmd_name not in self.commands:
+            module = importlib.import_module(self.lazy_commands[cmd_name], __package__)
+            self.add_command(module.group, cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+@click.group(
+    cls=LazyGroup,
+    lazy_commands={
+        'agents': '.commands.agents',
+        'permissions': '.commands.permissions',
+        'keys': '.commands.keys',
+        'logs': '.commands.logs',
+        'init': '.commands.init',
+        'providers': '.commands.providers',
+    }
+)
 @click.option(
     '--debug',
     is_flag=True,
@@ -64,7 +93,7 @@ def cli(ctx, debug: bool, registry_url: str, provider_id: str, provider_secret:
         return
     
     # Ensure we have all required values
-    if not all([registry_url, provider_id, provider_secret]):
+    if not (registry_url and provider_id and provider_secret):
         raise click.UsageError(
             "Missing required credentials. Either:\n"
             "1. Provide them as arguments\n"
@@ -73,6 +102,7 @@ def cli(ctx, debug: bool, registry_url: str, provider_id: str, provider_secret:
         )
     
     # Initialize auth
+    from .auth import CLIAuth
     try:
         auth = CLIAuth(
             registry_url=registry_url,
@@ -89,13 +119,5 @@ def cli(ctx, debug: bool, registry_url: str, provider_id: str, provider_secret:
     ctx.obj['provider_id'] = provider_id
     ctx.obj['debug'] = debug  # Store debug flag in context
 
-# Add command groups
-cli.add_command(agents.group)
-cli.add_command(permissions.group)
-cli.add_command(keys.group)
-cli.add_command(logs.group)
-cli.add_command(init.group)
-cli.add_command(providers.group)
-
 if __name__ == '__main__':
     cli() 
\ No newline at end of file
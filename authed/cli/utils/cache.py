@@ -0,0 +1,65 @@
+"""Cached readers for CLI configuration files.
+
+Entries are keyed by path, modification time and size, so a cached value
+is dropped as soon as the file changes on disk.
+"""
+
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict
+
+from ...core.jsonio import loads
+from .env import parse_env
+
+@lru_cache(maxsize=8)
+def _read_config(path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    return loads(Path(path).read_bytes())
+
+@lru_cache(maxsize=8)
+def _read_env(path: str, mtime_ns: int, size: int) -> Dict[str, str]:
+    try:
+        from dotenv import dotenv_values
+    except ImportError:
+        dotenv_values = None
+    
+    if dotenv_values is not None:
+        # No ${VAR} expansion: values are read back and written to .env again
+        values = dotenv_values(path, interpolate=False)
+        return {key: value for key, value in values.items() if value is not None}
+    
+    # Parser used when python-dotenv is not installed
+    return parse_env(Path(path).read_text())
+
+def load_config_cached(path: Path) -> Dict[str, Any]:
+    """Load a JSON config file, reusing the parsed result while it is unchanged.
+
+    The returned dict is shared between callers; copy it before mutating.
+
+    Args:
+        path: Path to the JSON config file
+
+    Returns:
+        Dict[str, Any]: The parsed config
+    """
+    st = os.stat(path)
+    return _read_config(str(path), st.st_mtime_ns, st.st_size)
+
+def load_env_cached(path: Path) -> Dict[str, str]:
+    """Load a .env file, reusing the parsed result while it is unchanged.
+
+    The returned dict is shared between callers; copy it before mutating.
+
+    Args:
+        path: Path to the .env file
+
+    Returns:
+        Dict[str, str]: Mapping of variable names to unquoted values
+    """
+    st = os.stat(path)
+    return _read_env(str(path), st.st_mtime_ns, st.st_size)
+
+def clear_cache():
+    """Drop all cached file contents (call after writing a cached file)."""
+    _read_config.cache_clear()
+    _read_env.cache_clear()
@@ -0,0 +1,97 @@
+"""Helpers for reading and writing .env files."""
+
+import re
+from typing import Dict
+
+# One .env assignment as python-dotenv reads it: optional `export`, then a
+# double-quoted (may span lines), single-quoted or bare value and an
+# optional trailing comment. A CR of a CRLF line ending is left outside the
+# match so rewriting an assignment keeps the line ending.
+_ENV_RE = re.compile(
+    r'^[ \t]*(?:export[ \t]+)?([A-Za-z_][A-Za-z0-9_]*)[ \t]*=([ \t]*)'
+    r'(?:"((?:\\.|[^"\\])*)"[ \t]*(?:#[^\r\n]*)?|\'((?:\\.|[^\'\\])*)\'[ \t]*(?:#[^\r\n]*)?'
+    r'|([^\r\n]*))(?=\r?$)',
+    re.MULTILINE
+)
+_DOUBLE_ESCAPE_RE = re.compile(r'\\([\\\'"abfnrtv])')
+_SINGLE_ESCAPE_RE = re.compile(r"\\([\\'])")
+_ESCAPES = {'a': '\a', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v'}
+_INLINE_COMMENT_RE = re.compile(r'\s+#.*')
+
+def parse_env(text: str) -> Dict[str, str]:
+    """Parse .env file contents.
+
+    Args:
+        text: The file contents
+
+    Returns:
+        Dict[str, str]: Mapping of variable names to unquoted values
+    """
+    env = {}
+    for m in _ENV_RE.finditer(text):
+        key, space, double, single, bare = m.groups()
+        if double is not None:
+            env[key] = _DOUBLE_ESCAPE_RE.sub(lambda e: _ESCAPES.get(e.group(1), e.group(1)), double)
+        elif single is not None:
+            env[key] = _SINGLE_ESCAPE_RE.sub(r'\1', single)
+        elif space and bare.startswith('#'):
+            # `KEY= # comment` is an empty value, `KEY=#value` is not
+            env[key] = ''
+        else:
+            env[key] = _INLINE_COMMENT_RE.sub('', bare).rstrip()
+    return env
+
+def quote_env_value(value: str) -> str:
+    """Quote a value for a .env file.
+
+    Single-line values are single-quoted, so `$` and the rest of the value
+    stay literal for dotenv and shell-style loaders alike. Values that span
+    lines (such as PEM keys) or contain quotes or backslashes are
+    double-quoted with backslashes and double quotes escaped.
+
+    Args:
+        value: The raw value
+
+    Returns:
+        str: The quoted value
+    """
+    if "\n" in value or "'" in value or "\\" in value:
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    return "'" + value + "'"
+
+def update_env(text: str, updates: Dict[str, str]) -> str:
+    """Set variables in .env file contents, keeping every other line verbatim.
+
+    Existing assignments of an updated variable are rewritten in place;
+    variables the file does not define yet are appended in an Authed
+    section.
+
+    Args:
+        text: The current file contents (empty for a new file)
+        updates: Mapping of variable names to raw values
+
+    Returns:
+        str: The new file contents
+    """
+    present = set()
+
+    def replace(m):
+        key = m.group(1)
+        if key not in updates:
+            return m.group(0)
+        present.add(key)
+        return f"{key}={quote_env_value(updates[key])}"
+
+    text = _ENV_RE.sub(replace, text)
+    missing = [key for key in updates if key not in present]
+    if not missing:
+        return text
+
+    buf = [text]
+    if text and not text.endswith("\n"):
+        buf.append("\n")
+    if "# Authed Configuration" not in text:
+        buf.append("\n# Authed Configuration\n" if text else "# Authed Configuration\n")
+    for key in missing:
+        buf.append(f"{key}={quote_env_value(updates[key])}\n")
+    return "".join(buf)
@@ -0,0 +1,38 @@
+"""File helpers for the CLI."""
+
+import os
+import stat
+from pathlib import Path
+
+def atomic_write_text(path: Path, data: str):
+    """Atomically replace a file's contents.
+
+    The data is written in one call to a temporary file next to `path`,
+    which is then renamed over it, so readers never see a partial file.
+    The existing file mode is kept; new files are created 0600 since
+    they usually hold credentials.
+
+    Args:
+        path: The file to write
+        data: The full new contents
+    """
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o600
+
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
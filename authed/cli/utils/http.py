@@ -0,0 +1,43 @@
+"""Shared HTTP client for CLI requests to the registry."""
+
+from ... import __version__
+
+_session = None
+
+def get_session():
+    """Get the process-wide httpx client.
+
+    Every registry call from the CLI goes through this client, both direct
+    posts (such as provider registration) and CLIAuth requests, so calls to
+    the same host share kept-alive connections and skip the TCP and TLS
+    handshakes after the first. HTTP/2 is used when the optional `h2`
+    package is installed, letting those calls share a single connection.
+
+    Returns:
+        httpx.Client: The shared client
+    """
+    global _session
+    if _session is None:
+        import httpx
+
+        try:
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            http2 = False
+
+        # Transport retries only cover connection failures, so non-idempotent
+        # calls like registration are never sent twice
+        transport = httpx.HTTPTransport(
+            http2=http2,
+            limits=httpx.Limits(max_connections=2, max_keepalive_connections=2),
+            retries=3
+        )
+        _session = httpx.Client(
+            transport=transport,
+            headers={
+                "Content-Type": "application/json",
+                "User-Agent": f"authed-cli/{__version__}"
+            }
+        )
+    return _session
@@ -1,109 +1,136 @@
-"""Key management utilities for the CLI."""
+"""Key management utilities for the CLI.
 
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
-from typing import Optional, Tuple
+Key handling lives in authed.core.keys; this module re-exports it and adds
+the CLI's on-disk pool of pre-generated keypairs.
+"""
 
-class KeyPair:
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+from ...core.keys import (  # re-export
+    DEFAULT_KEY_ALGORITHM,
+    PEM_RE,
+    KeyPair as _KeyPair,
+    is_pem,
+    load_or_generate_keys,
+    validate_public_key,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Pool of pre-generated keypairs, refilled in the background
+KEYPOOL_DIR = Path.home() / '.authed' / 'keypool'
+KEYPOOL_SIZE = 2
+DEFAULT_KEY_SIZE = 2048
+
+class KeyPair(_KeyPair):
     """Represents a public/private key pair."""
     
-    def __init__(self, public_key: str, private_key: str):
-        self.public_key = public_key
-        self.private_key = private_key
-    
     @classmethod
-    def generate(cls, key_size: int = 2048) -> 'KeyPair':
-        """Generate a new RSA keypair.
+    def generate(cls, key_size: int = DEFAULT_KEY_SIZE, algorithm: Optional[str] = None) -> 'KeyPair':
+        """Generate a new keypair.
+        
+        Default-sized RSA keys are taken from the on-disk key pool when one is
+        available, and the pool is refilled by a detached background process.
+        Ed25519 keys are cheap to generate and never pooled.
         
         Args:
-            key_size: Size of the key in bits (default: 2048)
+            key_size: Size of the key in bits for RSA keys (default: 2048)
+            algorithm: "rsa" or "ed25519" (default: $AUTHED_KEY_ALG, else "rsa")
             
         Returns:
             KeyPair: The generated key pair
         """
-        # Generate private key
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=key_size
-        )
-        
-        # Get public key
-        public_key = private_key.public_key()
-        
-        # Convert to PEM format
-        private_pem = private_key.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.PKCS8,
-            encryption_algorithm=serialization.NoEncryption()
-        ).decode('utf-8')
+        algorithm = (algorithm or DEFAULT_KEY_ALGORITHM).lower()
+        if algorithm != 'rsa' or key_size != DEFAULT_KEY_SIZE:
+            return super().generate(key_size, algorithm)
         
-        public_pem = public_key.public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        ).decode('utf-8')
-        
-        return cls(public_pem, private_pem)
-    
-    def is_valid(self) -> bool:
-        """Check if both keys are valid PEM format and match each other.
-        
-        Returns:
-            bool: True if both keys are valid and match
-        """
-        try:
-            # Try to load private key
-            private_key = serialization.load_pem_private_key(
-                self.private_key.encode(),
-                password=None
-            )
-            
-            # Try to load public key
-            public_key = serialization.load_pem_public_key(
-                self.public_key.encode()
-            )
-            
-            # Verify the public key matches the private key
-            return public_key.public_numbers() == private_key.public_key().public_numbers()
-        except Exception:
-            return False
+        keypair = _keypool_take()
+        if keypair is None:
+            keypair = super().generate(key_size, algorithm)
+        _keypool_spawn_refill()
+        return keypair
 
-def load_or_generate_keys(env_vars: dict) -> KeyPair:
-    """Load keys from environment variables or generate new ones if invalid.
+def _keypool_take() -> Optional[KeyPair]:
+    """Claim a pre-generated keypair from the key pool.
     
-    Args:
-        env_vars: Dictionary of environment variables
-        
     Returns:
-        KeyPair: The loaded or generated key pair
+        KeyPair: A pooled key pair, or None if the pool is empty
     """
-    # Try to load existing keys
-    if 'AUTHED_PRIVATE_KEY' in env_vars and 'AUTHED_PUBLIC_KEY' in env_vars:
-        keypair = KeyPair(
-            env_vars['AUTHED_PUBLIC_KEY'].strip('"\' '),
-            env_vars['AUTHED_PRIVATE_KEY'].strip('"\' ')
-        )
-        if keypair.is_valid():
-            return keypair
+    try:
+        entries = sorted(name for name in os.listdir(KEYPOOL_DIR) if name.endswith('.json'))
+    except OSError:
+        return None
     
-    # Generate new keys if not found or invalid
-    return KeyPair.generate()
+    for name in entries:
+        path = KEYPOOL_DIR / name
+        claimed = path.with_suffix(f'.claimed-{os.getpid()}')
+        try:
+            # Rename is atomic, so only one process can claim a given entry
+            os.rename(path, claimed)
+        except OSError:
+            continue
+        try:
+            with claimed.open('r') as f:
+                data = json.load(f)
+            return KeyPair(data['public_key'], data['private_key'])
+        except (OSError, ValueError, KeyError):
+            continue
+        finally:
+            try:
+                claimed.unlink()
+            except OSError:
+                pass
+    return None
+
+def _keypool_spawn_refill(size: int = KEYPOOL_SIZE):
+    """Refill the key pool in a detached background process."""
+    try:
+        subprocess.Popen(
+            [sys.executable, '-m', 'authed.cli.utils.keys', '--refill', str(size)],
+            start_new_session=True,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+    except OSError:
+        pass
 
-def validate_public_key(key: str) -> bool:
-    """Validate if a string is a valid public key.
+def _keypool_refill(size: int = KEYPOOL_SIZE):
+    """Generate keypairs until the key pool holds `size` entries.
     
     Args:
-        key: The public key string to validate
-        
-    Returns:
-        bool: True if the key is valid
+        size: Number of keypairs to keep in the pool
     """
-    try:
-        # Basic format check
-        if not key.startswith('-----BEGIN PUBLIC KEY-----') or not key.endswith('-----END PUBLIC KEY-----'):
-            return False
-            
-        # Try to load the key
-        serialization.load_pem_public_key(key.encode())
-        return True
-    except Exception:
-        return False 
\ No newline at end of file
+    KEYPOOL_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+    
+    with (KEYPOOL_DIR / '.lock').open('w') as lock:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                # Another process is already refilling the pool
+                return
+        
+        while len([name for name in os.listdir(KEYPOOL_DIR) if name.endswith('.json')]) < size:
+            keypair = _KeyPair.generate(algorithm='rsa')
+            name = os.urandom(8).hex()
+            tmp = KEYPOOL_DIR / f'{name}.tmp'
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump({
+                    'public_key': keypair.public_key,
+                    'private_key': keypair.private_key
+                }, f)
+            os.replace(tmp, KEYPOOL_DIR / f'{name}.json')
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == '--refill':
+        _keypool_refill(int(sys.argv[2]))
@@ -0,0 +1 @@
+"""Core utilities shared by the Authed SDK and CLI."""
@@ -0,0 +1,39 @@
+"""JSON encoding helpers that use orjson when it is installed."""
+
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
+
+if orjson is not None:
+    def loads(data: Union[bytes, str]) -> Any:
+        """Parse a JSON document."""
+        return orjson.loads(data)
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize `obj` as UTF-8 JSON indented by two spaces."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    def dumps_compact(obj: Any) -> bytes:
+        """Serialize `obj` as compact UTF-8 JSON."""
+        return orjson.dumps(obj)
+else:
+    # json.dumps() builds a new encoder whenever options are passed, so keep
+    # one configured encoder per output style
+    _indent_encoder = json.JSONEncoder(indent=2, ensure_ascii=False)
+    _compact_encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+    def loads(data: Union[bytes, str]) -> Any:
+        """Parse a JSON document."""
+        return json.loads(data)
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize `obj` as UTF-8 JSON indented by two spaces."""
+        return _indent_encoder.encode(obj).encode('utf-8')
+
+    def dumps_compact(obj: Any) -> bytes:
+        """Serialize `obj` as compact UTF-8 JSON."""
+        return _compact_encoder.encode(obj).encode('utf-8')
@@ -1,10 +1,27 @@
 """Centralized key management for Authed."""
 
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
-from typing import Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+from functools import cached_property
 from pathlib import Path
-import json
+import hashlib
+import os
+import re
+
+from .jsonio import dumps, loads
+
+# cryptography is imported inside the functions that use it, since loading
+# the OpenSSL bindings dominates startup of short-lived CLI commands
+
+# PEM block with matching BEGIN/END labels and a non-empty body
+PEM_RE = re.compile(r'-----BEGIN ([A-Z ]+)-----\s+\S[\s\S]*\S\s+-----END \1-----')
+
+# Key algorithm used when none is requested explicitly ("rsa" or "ed25519")
+DEFAULT_KEY_ALGORITHM = os.environ.get('AUTHED_KEY_ALG', 'rsa').lower()
+
+# Results of KeyPair.is_valid keyed by SHA-256 of both PEMs, so repeated
+# checks of the same keys skip PEM parsing without retaining the keys
+_VALIDITY_CACHE_SIZE = 64
+_validity_cache: Dict[Tuple[bytes, bytes], bool] = {}
 
 class KeyPair:
     """Represents a public/private key pair."""
@@ -14,20 +31,63 @@ class KeyPair:
         self.private_key = private_key
     
     @classmethod
-    def generate(cls, key_size: int = 2048) -> 'KeyPair':
-        """Generate a new RSA keypair.
+    def generate(cls, key_size: int = 2048, algorithm: Optional[str] = None) -> 'KeyPair':
+        """Generate a new keypair.
         
         Args:
-            key_size: Size of the key in bits (default: 2048)
+            key_size: Size of the key in bits for RSA keys (default: 2048)
+            algorithm: "rsa" or "ed25519" (default: $AUTHED_KEY_ALG, else "rsa")
             
         Returns:
             KeyPair: The generated key pair
         """
+        return cls._generate(key_size, algorithm)
+    
+    @classmethod
+    def generate_batch(
+        cls,
+        n: int,
+        workers: Optional[int] = None,
+        key_size: int = 2048,
+        algorithm: Optional[str] = None
+    ) -> List['KeyPair']:
+        """Generate several keypairs in parallel.
+        
+        OpenSSL releases the GIL during key generation, so threads scale
+        with the number of cores without the cost of starting processes.
+        
+        Args:
+            n: Number of keypairs to generate
+            workers: Number of threads (default: os.cpu_count())
+            key_size: Size of the key in bits for RSA keys (default: 2048)
+            algorithm: "rsa" or "ed25519" (default: $AUTHED_KEY_ALG, else "rsa")
+            
+        Returns:
+            List[KeyPair]: The generated key pairs
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            return list(executor.map(lambda _: cls._generate(key_size, algorithm), range(n)))
+    
+    @classmethod
+    def _generate(cls, key_size: int, algorithm: Optional[str]) -> 'KeyPair':
+        """Create a keypair with cryptography, bypassing any subclass pooling."""
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+        
+        algorithm = (algorithm or DEFAULT_KEY_ALGORITHM).lower()
+        
         # Generate private key
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=key_size
-        )
+        if algorithm == 'ed25519':
+            private_key = ed25519.Ed25519PrivateKey.generate()
+        elif algorithm == 'rsa':
+            private_key = rsa.generate_private_key(
+                public_exponent=65537,
+                key_size=key_size
+            )
+        else:
+            raise ValueError(f"Unsupported key algorithm: {algorithm}")
         
         # Get public key
         public_key = private_key.public_key()
@@ -44,7 +104,12 @@ class KeyPair:
             format=serialization.PublicFormat.SubjectPublicKeyInfo
         ).decode('utf-8')
         
-        return cls(public_pem, private_pem)
+        keypair = cls(public_pem, private_pem)
+        
+        # Seed the parsed-key caches so callers don't re-parse the new PEMs
+        keypair.__dict__['private_key_object'] = private_key
+        keypair.__dict__['public_key_object'] = public_key
+        return keypair
     
     @classmethod
     def from_file(cls, file_path: str) -> 'KeyPair':
@@ -56,9 +121,8 @@ class KeyPair:
         Returns:
             KeyPair: The loaded key pair
         """
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-            return cls(data['public_key'], data['private_key'])
+        data = loads(Path(file_path).read_bytes())
+        return cls(data['public_key'], data['private_key'])
     
     def save(self, file_path: str):
         """Save the key pair to a JSON file.
@@ -66,31 +130,73 @@ class KeyPair:
         Args:
             file_path: Path where to save the keys
         """
-        with open(file_path, 'w') as f:
-            json.dump({
-                'public_key': self.public_key,
-                'private_key': self.private_key
-            }, f, indent=2)
+        Path(file_path).write_bytes(dumps({
+            'public_key': self.public_key,
+            'private_key': self.private_key
+        }))
+    
+    @cached_property
+    def private_key_object(self) -> Any:
+        """The private key parsed from its PEM, loaded on first access.
+        
+        Raises:
+            ValueError: If the private key PEM cannot be parsed
+        """
+        from cryptography.hazmat.primitives import serialization
+        
+        return serialization.load_pem_private_key(
+            self.private_key.encode(),
+            password=None
+        )
+    
+    @cached_property
+    def public_key_object(self) -> Any:
+        """The public key parsed from its PEM, loaded on first access.
+        
+        Raises:
+            ValueError: If the public key PEM cannot be parsed
+        """
+        from cryptography.hazmat.primitives import serialization
+        
+        return serialization.load_pem_public_key(self.public_key.encode())
     
     def is_valid(self) -> bool:
-        """Check if both keys are valid PEM format.
+        """Check if both keys are valid PEM format and match each other.
+        
+        Results are cached by key fingerprint.
         
         Returns:
-            bool: True if both keys are valid
+            bool: True if both keys are valid and match
         """
         try:
-            # Try to load private key
-            private_key = serialization.load_pem_private_key(
-                self.private_key.encode(),
-                password=None
-            )
-            
-            # Try to load public key
-            public_key = serialization.load_pem_public_key(
-                self.public_key.encode()
+            fingerprint = (
+                hashlib.sha256(self.public_key.encode()).digest(),
+                hashlib.sha256(self.private_key.encode()).digest()
             )
+        except AttributeError:
+            return False
+        
+        valid = _validity_cache.get(fingerprint)
+        if valid is None:
+            valid = self._check_valid()
+            if len(_validity_cache) >= _VALIDITY_CACHE_SIZE:
+                _validity_cache.pop(next(iter(_validity_cache)))
+            _validity_cache[fingerprint] = valid
+        return valid
+    
+    def _check_valid(self) -> bool:
+        """Parse both keys and check that they match."""
+        from cryptography.hazmat.primitives.asymmetric import ed25519
+        
+        try:
+            private_key = self.private_key_object
+            public_key = self.public_key_object
             
             # Verify the public key matches the private key
+            if isinstance(private_key, ed25519.Ed25519PrivateKey):
+                if not isinstance(public_key, ed25519.Ed25519PublicKey):
+                    return False
+                return private_key.public_key().public_bytes_raw() == public_key.public_bytes_raw()
             return public_key.public_numbers() == private_key.public_key().public_numbers()
         except Exception:
             return False
@@ -125,13 +231,28 @@ def validate_public_key(key: str) -> bool:
     Returns:
         bool: True if the key is valid
     """
+    from cryptography.hazmat.primitives import serialization
+    
     try:
         # Basic format check
-        if not key.startswith('-----BEGIN PUBLIC KEY-----') or not key.endswith('-----END PUBLIC KEY-----'):
+        if not is_pem(key, 'PUBLIC KEY'):
             return False
             
         # Try to load the key
         serialization.load_pem_public_key(key.encode())
         return True
     except Exception:
-        return False 
\ No newline at end of file
+        return False
+
+def is_pem(data: str, label: Optional[str] = None) -> bool:
+    """Check if a string is a single well-formed PEM block.
+    
+    Args:
+        data: The string to check
+        label: Optional required label, e.g. "PUBLIC KEY"
+        
+    Returns:
+        bool: True if the string is a PEM block (with the given label)
+    """
+    match = PEM_RE.fullmatch(data.strip())
+    return match is not None and (label is None or match.group(1) == label)
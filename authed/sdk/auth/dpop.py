@@ -3,6 +3,7 @@
 import uuid
 import time
 from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
 import jwt
 
 class DPoPHandler:
@@ -39,29 +40,38 @@ class DPoPHandler:
         }
         
         # Create headers with key type and algorithm
-        headers = {
-            "typ": "dpop+jwt",
-            "alg": "RS256",
-            "jwk": {
+        public_key = private_key.public_key()
+        if isinstance(private_key, ed25519.Ed25519PrivateKey):
+            algorithm = "EdDSA"
+            jwk = {
+                "kty": "OKP",
+                "crv": "Ed25519",
+                "use": "sig",
+                "alg": algorithm,
+                "x": jwt.utils.base64url_encode(public_key.public_bytes_raw()).decode('utf-8')
+            }
+        else:
+            algorithm = "RS256"
+            public_numbers = public_key.public_numbers()
+            jwk = {
                 "kty": "RSA",
                 "use": "sig",
-                "alg": "RS256"
+                "alg": algorithm,
+                "n": jwt.utils.base64url_encode(public_numbers.n.to_bytes((public_numbers.n.bit_length() + 7) // 8, byteorder='big')).decode('utf-8'),
+                "e": jwt.utils.base64url_encode(public_numbers.e.to_bytes((public_numbers.e.bit_length() + 7) // 8, byteorder='big')).decode('utf-8')
             }
-        }
         
-        # Add public key components to JWK
-        public_key = private_key.public_key()
-        public_numbers = public_key.public_numbers()
-        headers["jwk"].update({
-            "n": jwt.utils.base64url_encode(public_numbers.n.to_bytes((public_numbers.n.bit_length() + 7) // 8, byteorder='big')).decode('utf-8'),
-            "e": jwt.utils.base64url_encode(public_numbers.e.to_bytes((public_numbers.e.bit_length() + 7) // 8, byteorder='big')).decode('utf-8')
-        })
+        headers = {
+            "typ": "dpop+jwt",
+            "alg": algorithm,
+            "jwk": jwk
+        }
         
         # Create and sign the proof
         proof = jwt.encode(
             payload,
             private_key,
-            algorithm="RS256",
+            algorithm=algorithm,
             headers=headers
         )
         
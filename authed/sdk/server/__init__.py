@@ -1,7 +1,8 @@
 """Server package for agent communication."""
 
-from .websocket import WebSocketHandler
+from .websocket import Connection, WebSocketHandler
 
 __all__ = [
+    "Connection",
     "WebSocketHandler"
 ] 
\ No newline at end of file
@@ -1,18 +1,66 @@
 """WebSocket server handler for agent communication."""
 
+import asyncio
+import inspect
+import itertools
 import json
 import logging
 import os
+import socket
+import time
 import uuid
 from datetime import datetime, timezone
+from functools import lru_cache, partial
 from typing import Dict, Any, Callable, Awaitable, Optional
-import websockets
+from websockets.exceptions import ConnectionClosed
 
+from ...core.jsonio import dumps_compact, loads
 from ..channel.protocol import MessageType
 from ..exceptions import AuthenticationError
 
 logger = logging.getLogger(__name__)
 
+# Outbound frames queued per connection before senders wait on the writer
+_SEND_QUEUE_SIZE = 1024
+
+# Most queued messages written back to back under one TCP cork
+_MAX_BATCH = 128
+
+# Malformed messages a connection may send before it is closed
+_MAX_BAD_MESSAGES = 5
+
+# Socket option that holds back partial TCP segments while a batch is
+# written: TCP_CORK on Linux, TCP_NOPUSH on BSD/macOS
+_CORK_OPTION = getattr(socket, 'TCP_CORK', None) or getattr(socket, 'TCP_NOPUSH', None)
+
+# Set AUTHED_UUID_MESSAGE_IDS=1 to use RFC 4122 UUIDs for response message IDs
+# instead of the cheaper "<random prefix>:<counter>" form
+_UUID_MESSAGE_IDS = os.environ.get("AUTHED_UUID_MESSAGE_IDS", "0") == "1"
+
+# Fixed response contents, built once and shared by every response (never
+# mutated; they are serialized as-is)
+_ACCEPT_CONTENT = {
+    "type": MessageType.CHANNEL_ACCEPT,
+    "data": {
+        "protocol_version": "1.0",
+        "capabilities": ["json"]
+    }
+}
+_HEARTBEAT_CONTENT = {
+    "type": MessageType.HEARTBEAT,
+    "data": {}
+}
+_ACCEPT_CONTENT_JSON = dumps_compact(_ACCEPT_CONTENT)
+_HEARTBEAT_CONTENT_JSON = dumps_compact(_HEARTBEAT_CONTENT)
+
+# Serialized response envelope, with the same key order as the dict form.
+# Message IDs and timestamps are spliced in quoted as they never need
+# escaping; the other fields are filled with JSON-encoded values.
+_RESPONSE_TEMPLATE = (
+    b'{"meta":{"message_id":"%b","sender":%b,"recipient":%b,"timestamp":"%b",'
+    b'"sequence":%d,"channel_id":%b,"reply_to":%b},"content":%b}'
+)
+
 # Import message recorder only if in test mode
 _TESTING = os.environ.get("AUTHED_TESTING", "0") == "1"
 if _TESTING:
@@ -23,18 +71,135 @@ if _TESTING:
         logger.warning("Message recorder not found, recording disabled")
         record_outgoing = record_incoming = lambda *args, **kwargs: None
 
+@lru_cache(maxsize=64)
+def _error_content(error_message: str) -> bytes:
+    """Serialize the content of an error reply.
+    
+    Cached because clients that repeat a bad message (such as an unknown
+    message type) get the same error text every time.
+    """
+    return dumps_compact({
+        "type": MessageType.ERROR,
+        "data": {
+            "message": error_message
+        }
+    })
+
+@lru_cache(maxsize=None)
+def _accepts_keyword(cls: type, method: str, keyword: str) -> bool:
+    """Check whether a connection class's method takes a keyword argument.
+    
+    The websockets library has two server implementations: the asyncio one
+    (websockets >= 13) and the legacy protocol, whose recv() and send() take
+    no options. Cached per class, so each check is done once.
+    """
+    try:
+        return keyword in inspect.signature(getattr(cls, method)).parameters
+    except (AttributeError, TypeError, ValueError):
+        return False
+
+class Connection:
+    """State of one WebSocket connection."""
+    
+    __slots__ = ("websocket", "remote_addr", "connected_at", "agent_id", "channel_id", "send_queue", "writer_task", "sock", "bad_messages")
+    
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.remote_addr = getattr(websocket, 'remote_address', ('unknown', 0))
+        self.connected_at = datetime.now(timezone.utc)
+        self.agent_id = None  # Will be set when we receive the first message
+        self.channel_id = None  # Will be set when we receive channel.open
+        self.send_queue = None  # Outbound frames, set once authenticated
+        self.writer_task = None  # Task draining send_queue
+        self.sock = None  # Underlying TCP socket, when the transport exposes it
+        self.bad_messages = 0  # Malformed messages received so far
+
+class _Envelope:
+    """Fields of an incoming message, validated and extracted in one pass."""
+    
+    __slots__ = ("message", "meta", "content", "content_type", "sender_id", "channel_id", "message_id", "reply_to")
+    
+    @classmethod
+    def parse(cls, message: Any) -> Optional['_Envelope']:
+        """Extract the envelope fields of a decoded message.
+        
+        Args:
+            message: The decoded JSON message
+            
+        Returns:
+            _Envelope: The extracted fields, or None if the message lacks a
+            "meta" or "content" object. content_type is None when the
+            content has no "type".
+        """
+        if not isinstance(message, dict):
+            return None
+        meta = message.get("meta")
+        content = message.get("content")
+        if not isinstance(meta, dict) or not isinstance(content, dict):
+            return None
+        
+        envelope = cls()
+        envelope.message = message
+        envelope.meta = meta
+        envelope.content = content
+        envelope.content_type = content.get("type")
+        # Accept both 'sender_id' and 'sender' for compatibility
+        envelope.sender_id = meta["sender_id"] if "sender_id" in meta else meta.get("sender", "anonymous")
+        envelope.channel_id = meta.get("channel_id")
+        envelope.message_id = meta.get("message_id")
+        envelope.reply_to = meta.get("message_id", "")
+        return envelope
+    
+    def channel_id_or(self, default: str) -> Any:
+        """Get the channel ID, or `default` if the message has none."""
+        return self.meta.get("channel_id", default)
+
 class WebSocketHandler:
-    """Handler for incoming WebSocket connections."""
+    """Handler for incoming WebSocket connections.
+    
+    Traffic is many small JSON frames, for which permessage-deflate costs a
+    zlib pass per frame and saves little or nothing. Serve the handler with
+    compression off: `ws_per_message_deflate=False` for uvicorn, or
+    `compression=None` for `websockets.serve`. Large payloads sent to many
+    peers are better compressed once by the application.
+    """
     
     def __init__(self, authed_sdk):
         """Initialize WebSocket handler.
         
+        The handler awaits on every send and receive, so it benefits from
+        uvloop. uvicorn picks uvloop up automatically when it is installed
+        (as with uvicorn[standard]), which covers the SDK's agent servers.
+        
         Args:
             authed_sdk: Reference to the Authed SDK instance
         """
         self.authed = authed_sdk
         self.message_handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]] = {}
-        self.active_connections: Dict[str, Dict[str, Any]] = {}  # Map of channel_id to connection info
+        self.active_connections: Dict[str, Connection] = {}  # Map of channel_id to connection
+        self._connections: Dict[Any, Connection] = {}  # Map of websocket to its live connection
+        
+        # Token verifier, resolved once; None falls back to a simple check
+        self._verify_token = getattr(getattr(authed_sdk, 'auth', None), 'verify_token', None)
+        
+        # Channel management messages, dispatched with one lookup
+        self._builtin_handlers = {
+            MessageType.CHANNEL_OPEN: self._handle_channel_open,
+            MessageType.CHANNEL_CLOSE: self._handle_channel_close,
+            MessageType.HEARTBEAT: self._handle_heartbeat
+        }
+        
+        # Response message IDs: a random per-handler prefix plus a counter
+        self._id_prefix = uuid.uuid4().hex[:16]
+        self._msg_seq = itertools.count(1)
+        
+        # Last formatted timestamp and the millisecond it was taken in
+        self._ts_tick = None
+        self._ts_str = None
+        
+        # Our agent ID and its JSON encoding, for response templates
+        self._sender_id = None
+        self._sender_json = b"null"
         
     def register_handler(self, 
                         message_type: str, 
@@ -50,13 +215,7 @@ class WebSocketHandler:
     async def handle_connection(self, websocket, path):
         """Handle an incoming WebSocket connection."""
         # Connection info
-        connection_info = {
-            "websocket": websocket,
-            "remote_addr": getattr(websocket, 'remote_address', ('unknown', 0)),
-            "connected_at": datetime.now(timezone.utc),
-            "agent_id": None,  # Will be set when we receive the first message
-            "channel_id": None  # Will be set when we receive channel.open
-        }
+        connection = Connection(websocket)
         
         # Authenticate the connection
         # For FastAPI WebSocket, headers are in websocket.headers
@@ -90,153 +249,219 @@ class WebSocketHandler:
             await websocket.close(1008, "Missing authentication")
             return
             
-        # Verify token with registry
-        token = auth_header.replace('Bearer ', '')
-        try:
-            # Check if verify_token method exists
-            if hasattr(self.authed.auth, 'verify_token'):
-                is_valid = await self.authed.auth.verify_token(token)
-            else:
-                # Fallback to a simple check if method doesn't exist
-                # This should be replaced with proper verification
-                logger.warning("verify_token method not found, using simple validation")
-                is_valid = bool(token)
-                
-            if not is_valid:
+        if not auth_header.startswith('Bearer '):
+            await websocket.close(1008, "Bad auth scheme")
+            return
+            
+        # Verify token with registry. The check runs in the background while
+        # we wait for the first frame, so the registry round-trip overlaps
+        # with the client's first send; a failed check closes the connection
+        # right away, and frames are only handled once it has passed.
+        token = auth_header[len('Bearer '):].strip()
+        auth_task = None
+        if self._verify_token is not None:
+            auth_task = asyncio.ensure_future(self._authenticate(websocket, self._verify_token(token)))
+        else:
+            # Fallback to a simple check if method doesn't exist
+            # This should be replaced with proper verification
+            logger.warning("verify_token method not found, using simple validation")
+            if not token:
                 await websocket.close(1008, "Invalid authentication")
                 return
-        except AuthenticationError as e:
-            logger.error(f"Authentication error: {str(e)}")
-            await websocket.close(1008, "Authentication error")
-            return
+        verified = auth_task is None
             
+        # Queue outbound messages for a single writer task, which writes
+        # whatever is pending back to back
+        connection.sock = self._tcp_socket(websocket)
+        connection.send_queue = asyncio.Queue(maxsize=_SEND_QUEUE_SIZE)
+        connection.writer_task = asyncio.ensure_future(
+            self._writer_loop(websocket, connection.send_queue, connection.sock)
+        )
+        self._connections[websocket] = connection
+        
         # Handle messages
         try:
             # Check if websocket is a FastAPI WebSocket or a standard websockets WebSocket
             if hasattr(websocket, 'receive_json'):
                 # FastAPI WebSocket
+                from starlette.websockets import WebSocketDisconnect
+                
                 while True:
                     try:
-                        # Parse message
                         message_data = await websocket.receive_text()
-                        message = json.loads(message_data)
-                        
-                        # Process message
-                        await self._process_message(websocket, message, connection_info)
-                    except json.JSONDecodeError:
-                        await self._send_error(websocket, "Invalid JSON")
+                    except WebSocketDisconnect:
+                        logger.info("WebSocket client disconnected")
+                        break
                     except RuntimeError as e:
                         # Handle WebSocket disconnection
                         if "Cannot call" in str(e) and "disconnect message" in str(e):
                             logger.info("WebSocket client disconnected")
-                            break
                         else:
                             logger.error(f"WebSocket runtime error: {str(e)}")
+                        break
+                    
+                    if not verified:
+                        if not await auth_task:
                             break
-                    except Exception as e:
-                        logger.error(f"Error processing message: {str(e)}")
-                        try:
-                            await self._send_error(websocket, f"Internal error: {str(e)}")
-                        except Exception:
-                            # If sending the error fails, just log it and continue
-                            logger.error("Failed to send error message after processing error")
-                            break
-            else:
-                # Standard websockets WebSocket
-                async for message_data in websocket:
+                        verified = True
+                    
+                    # Parse message; a frame that is not JSON has nothing to
+                    # reply to, so the connection is closed as invalid payload
                     try:
-                        # Parse message
-                        message = json.loads(message_data)
-                        
-                        # Process message
-                        await self._process_message(websocket, message, connection_info)
-                    except json.JSONDecodeError:
-                        await self._send_error(websocket, "Invalid JSON")
-                    except Exception as e:
-                        logger.error(f"Error processing message: {str(e)}")
-                        try:
-                            await self._send_error(websocket, f"Internal error: {str(e)}")
-                        except Exception:
-                            # If sending the error fails, just log it and continue
-                            logger.error("Failed to send error message after processing error")
+                        message = loads(message_data)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        await websocket.close(1007, "Invalid JSON")
+                        break
+                    
+                    await self._process_message(websocket, message, connection)
+                    if connection.bad_messages > _MAX_BAD_MESSAGES:
+                        await websocket.close(1008, "Too many invalid messages")
+                        break
+            else:
+                # Standard websockets WebSocket. On the asyncio API (websockets
+                # >= 13), decode=False hands over the raw UTF-8 bytes, which the
+                # JSON parser validates itself; the legacy protocol's recv()
+                # takes no arguments and returns str.
+                if _accepts_keyword(type(websocket), 'recv', 'decode'):
+                    recv = partial(websocket.recv, decode=False)
+                else:
+                    recv = websocket.recv
+                    
+                while True:
+                    message_data = await recv()
+                    
+                    if not verified:
+                        if not await auth_task:
                             break
+                        verified = True
                     
-        except websockets.exceptions.ConnectionClosed:
+                    # Parse message; a frame that is not JSON has nothing to
+                    # reply to, so the connection is closed as invalid payload
+                    try:
+                        message = loads(message_data)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        await websocket.close(1007, "Invalid JSON")
+                        break
+                    
+                    await self._process_message(websocket, message, connection)
+                    if connection.bad_messages > _MAX_BAD_MESSAGES:
+                        await websocket.close(1008, "Too many invalid messages")
+                        break
+                    
+        except ConnectionClosed:
             logger.info("WebSocket connection closed")
         except Exception as e:
             logger.error(f"WebSocket handler error: {str(e)}")
         finally:
+            if not verified:
+                self._discard_verification(auth_task)
+            
+            # Flush queued messages, then stop the writer
+            self._connections.pop(websocket, None)
+            if not connection.writer_task.done():
+                try:
+                    await connection.send_queue.put(None)
+                    await connection.writer_task
+                except Exception as e:
+                    logger.debug(f"Writer stopped with error: {str(e)}")
+            
             # Clean up connection
-            if connection_info["channel_id"]:
-                self.active_connections.pop(connection_info["channel_id"], None)
-                logger.info(f"Removed channel {connection_info['channel_id']} from active connections")
+            if connection.channel_id:
+                self.active_connections.pop(connection.channel_id, None)
+                logger.info(f"Removed channel {connection.channel_id} from active connections")
                 
-    async def _process_message(self, websocket, message, connection_info):
+    async def _authenticate(self, websocket, verification) -> bool:
+        """Wait for the connection's token check, closing the socket if it fails.
+        
+        Runs as a task from the moment the connection is accepted, so a
+        client with a bad token is disconnected even if it never sends.
+        
+        Args:
+            websocket: The connection's WebSocket
+            verification: Awaitable token verification
+            
+        Returns:
+            bool: True if the token is valid
+        """
+        try:
+            is_valid = await verification
+        except AuthenticationError as e:
+            logger.error(f"Authentication error: {str(e)}")
+            await websocket.close(1008, "Authentication error")
+            return False
+        except Exception as e:
+            logger.error(f"Token verification failed: {str(e)}")
+            await websocket.close(1011, "Authentication unavailable")
+            return False
+            
+        if not is_valid:
+            await websocket.close(1008, "Invalid authentication")
+            return False
+        return True
+        
+    @staticmethod
+    def _discard_verification(auth_task):
+        """Stop a token check whose result is no longer needed."""
+        if not auth_task.done():
+            auth_task.cancel()
+        elif not auth_task.cancelled():
+            # Retrieve the error so it is not reported as unhandled
+            auth_task.exception()
+        
+    async def _process_message(self, websocket, message, connection):
         """Process a received message."""
         # Debug log the message structure
-        logger.debug(f"Received message: {json.dumps(message, indent=2)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Received message: {json.dumps(message, indent=2)}")
         
         # Record incoming message if in test mode
         if _TESTING:
             sender_id = message.get("meta", {}).get("sender_id", message.get("meta", {}).get("sender", "unknown"))
             record_incoming(message, sender_id, self.authed.agent_id)
         
+        envelope = None
         try:
-            # Validate message format
-            if "meta" not in message or "content" not in message:
+            # Validate message format and extract its fields once
+            envelope = _Envelope.parse(message)
+            if envelope is None:
+                connection.bad_messages += 1
                 await self._send_error(websocket, "Invalid message format")
                 return
             
             # Update connection info when we get sender info
-            # Handle both 'sender_id' and 'sender' fields for compatibility
-            meta = message.get("meta", {})
-            sender_id = meta.get("sender_id", meta.get("sender", "anonymous"))
+            sender_id = envelope.sender_id
             if sender_id:
-                connection_info["agent_id"] = sender_id
+                connection.agent_id = sender_id
                 
             # Get content type
-            if "content" in message and "type" in message["content"]:
-                content_type = message["content"]["type"]
-            else:
+            content_type = envelope.content_type
+            if content_type is None:
+                connection.bad_messages += 1
                 await self._send_error(websocket, "Invalid message content", None, sender_id)
                 return
             
             # Handle channel management messages
-            if content_type == MessageType.CHANNEL_OPEN:
-                # Update connection info
-                channel_id = meta.get("channel_id")
-                if channel_id:
-                    connection_info["channel_id"] = channel_id
-                    self.active_connections[channel_id] = connection_info
-                    
-                    await self._handle_channel_open(websocket, message)
-                else:
-                    await self._send_error(websocket, "Missing channel_id in message", None, sender_id)
-                return
-            elif content_type == MessageType.CHANNEL_CLOSE:
-                await self._handle_channel_close(websocket, message)
-                # Connection will be closed after this
-                return
-            elif content_type == MessageType.HEARTBEAT:
-                # Respond to heartbeats
-                await self._handle_heartbeat(websocket, message)
+            builtin_handler = self._builtin_handlers.get(content_type)
+            if builtin_handler is not None:
+                await builtin_handler(websocket, envelope, connection)
                 return
                 
             # Dispatch to registered handler
-            if content_type in self.message_handlers:
+            handler = self.message_handlers.get(content_type)
+            if handler is not None:
                 try:
-                    response_data = await self.message_handlers[content_type](message)
+                    response_data = await handler(message)
                     if response_data:
                         # Create a proper response envelope
                         response = {
                             "meta": {
-                                "message_id": str(uuid.uuid4()),
+                                "message_id": self._new_id(),
                                 "sender": self.authed.agent_id,
                                 "recipient": sender_id,
                                 "timestamp": self._get_iso_timestamp(),
                                 "sequence": 0,
-                                "channel_id": meta.get("channel_id", "unknown"),
-                                "reply_to": meta.get("message_id", "")
+                                "channel_id": envelope.channel_id_or("unknown"),
+                                "reply_to": envelope.reply_to
                             },
                             "content": response_data
                         }
@@ -245,101 +470,74 @@ class WebSocketHandler:
                         if _TESTING:
                             record_outgoing(response, self.authed.agent_id, sender_id)
                         
-                        # Check if this is a FastAPI WebSocket (has send_json method)
-                        if hasattr(websocket, 'send_json'):
-                            await websocket.send_json(response)
-                        elif hasattr(websocket, 'send_text'):
-                            await websocket.send_text(json.dumps(response))
-                        else:
-                            # Fallback to standard WebSocket
-                            await websocket.send(json.dumps(response))
+                        await self._send(websocket, response)
                 except Exception as e:
                     logger.error(f"Error in message handler: {str(e)}", exc_info=True)
                     await self._send_error(
                         websocket, 
                         f"Error processing message: {str(e)}",
-                        meta.get("message_id"),
+                        envelope.message_id,
                         sender_id
                     )
             else:
-                # Make sure we have the required fields for the error message
-                message_id = meta.get("message_id", None)
-                
                 await self._send_error(
                     websocket, 
                     f"Unsupported message type: {content_type}",
-                    message_id,
+                    envelope.message_id,
                     sender_id
                 )
         except Exception as e:
             logger.error(f"Error processing message: {str(e)}", exc_info=True)
             try:
-                meta = message.get("meta", {})
-                sender_id = meta.get("sender_id", meta.get("sender", "anonymous"))
-                message_id = meta.get("message_id", None)
-                await self._send_error(websocket, f"Internal error: {str(e)}", message_id, sender_id)
+                if envelope is not None:
+                    await self._send_error(websocket, f"Internal error: {str(e)}", envelope.message_id, envelope.sender_id)
+                else:
+                    await self._send_error(websocket, f"Internal error: {str(e)}")
             except Exception as inner_e:
                 logger.error(f"Error sending error message: {str(inner_e)}", exc_info=True)
         
-    async def _handle_channel_open(self, websocket, message):
+    async def _handle_channel_open(self, websocket, envelope, connection):
         """Handle channel open request."""
         try:
             # Extract information
-            meta = message.get("meta", {})
-            channel_id = meta.get("channel_id", str(uuid.uuid4()))
-            sender_id = meta.get("sender_id", meta.get("sender", "anonymous"))
+            channel_id = envelope.channel_id
+            sender_id = envelope.sender_id
+            if not channel_id:
+                await self._send_error(websocket, "Missing channel_id in message", None, sender_id)
+                return
+            
+            # Update connection info
+            connection.channel_id = channel_id
+            self.active_connections[channel_id] = connection
             
             # Log the open event
             logger.info(f"Channel {channel_id} open requested by {sender_id}")
             
             # Create response
-            response = {
-                "meta": {
-                    "message_id": str(uuid.uuid4()),
-                    "sender": self.authed.agent_id,
-                    "recipient": sender_id,
-                    "timestamp": self._get_iso_timestamp(),
-                    "sequence": 1,
-                    "channel_id": channel_id,
-                    "reply_to": meta.get("message_id", "")
-                },
-                "content": {
-                    "type": MessageType.CHANNEL_ACCEPT,
-                    "data": {
-                        "protocol_version": "1.0",
-                        "capabilities": ["json"]
-                    }
-                }
-            }
+            data = self._encode_response(_ACCEPT_CONTENT_JSON, 1, sender_id, channel_id, envelope.reply_to)
             
-            logger.debug(f"Sending channel accept response: {json.dumps(response, indent=2)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Sending channel accept response: {data.decode('utf-8')}")
             
             # Record outgoing message if in test mode
             if _TESTING:
-                record_outgoing(response, self.authed.agent_id, sender_id)
+                record_outgoing(loads(data), self.authed.agent_id, sender_id)
             
-            # Check if this is a FastAPI WebSocket (has send_json method)
-            if hasattr(websocket, 'send_json'):
-                await websocket.send_json(response)
-            elif hasattr(websocket, 'send_text'):
-                await websocket.send_text(json.dumps(response))
-            else:
-                # Fallback to standard WebSocket
-                await websocket.send(json.dumps(response))
+            await self._send_bytes(websocket, data)
                 
             logger.debug(f"Sent channel accept for channel {channel_id}")
         except Exception as e:
             logger.error(f"Error in _handle_channel_open: {str(e)}", exc_info=True)
             raise
         
-    async def _handle_channel_close(self, websocket, message):
+    async def _handle_channel_close(self, websocket, envelope, connection):
         """Handle channel close request."""
         try:
             # Extract information
-            meta = message.get("meta", {})
-            channel_id = meta.get("channel_id", "unknown")
-            sender_id = meta.get("sender_id", meta.get("sender", "anonymous"))
-            reason = message.get("content", {}).get("data", {}).get("reason", "normal")
+            channel_id = envelope.channel_id_or("unknown")
+            sender_id = envelope.sender_id
+            data = envelope.content.get("data")
+            reason = data.get("reason", "normal") if isinstance(data, dict) else "normal"
             
             # Log the close event
             logger.info(f"Channel {channel_id} close requested by {sender_id} with reason: {reason}")
@@ -347,13 +545,13 @@ class WebSocketHandler:
             # Send acknowledgment
             response = {
                 "meta": {
-                    "message_id": str(uuid.uuid4()),
+                    "message_id": self._new_id(),
                     "sender": self.authed.agent_id,
                     "recipient": sender_id,
                     "timestamp": self._get_iso_timestamp(),
                     "sequence": 1,
                     "channel_id": channel_id,
-                    "reply_to": meta.get("message_id", "")
+                    "reply_to": envelope.reply_to
                 },
                 "content": {
                     "type": MessageType.CHANNEL_CLOSE,
@@ -369,14 +567,7 @@ class WebSocketHandler:
                 record_outgoing(response, self.authed.agent_id, sender_id)
             
             try:
-                # Check if this is a FastAPI WebSocket (has send_json method)
-                if hasattr(websocket, 'send_json'):
-                    await websocket.send_json(response)
-                elif hasattr(websocket, 'send_text'):
-                    await websocket.send_text(json.dumps(response))
-                else:
-                    # Fallback to standard WebSocket
-                    await websocket.send(json.dumps(response))
+                await self._send(websocket, response)
                     
                 logger.debug(f"Sent close acknowledgment for channel {channel_id}")
             except Exception as e:
@@ -388,43 +579,22 @@ class WebSocketHandler:
             logger.error(f"Error in _handle_channel_close: {str(e)}", exc_info=True)
             raise
         
-    async def _handle_heartbeat(self, websocket, message):
+    async def _handle_heartbeat(self, websocket, envelope, connection):
         """Handle heartbeat message."""
         try:
             # Extract information
-            meta = message.get("meta", {})
-            channel_id = meta.get("channel_id", "unknown")
-            sender_id = meta.get("sender_id", meta.get("sender", "anonymous"))
+            sender_id = envelope.sender_id
             
             # Create response
-            response = {
-                "meta": {
-                    "message_id": str(uuid.uuid4()),
-                    "sender": self.authed.agent_id,
-                    "recipient": sender_id,
-                    "timestamp": self._get_iso_timestamp(),
-                    "sequence": 0,
-                    "channel_id": channel_id,
-                    "reply_to": meta.get("message_id", "")
-                },
-                "content": {
-                    "type": MessageType.HEARTBEAT,
-                    "data": {}
-                }
-            }
+            data = self._encode_response(
+                _HEARTBEAT_CONTENT_JSON, 0, sender_id, envelope.channel_id_or("unknown"), envelope.reply_to
+            )
             
             # Record outgoing message if in test mode
             if _TESTING:
-                record_outgoing(response, self.authed.agent_id, sender_id)
+                record_outgoing(loads(data), self.authed.agent_id, sender_id)
             
-            # Check if this is a FastAPI WebSocket (has send_json method)
-            if hasattr(websocket, 'send_json'):
-                await websocket.send_json(response)
-            elif hasattr(websocket, 'send_text'):
-                await websocket.send_text(json.dumps(response))
-            else:
-                # Fallback to standard WebSocket
-                await websocket.send(json.dumps(response))
+            await self._send_bytes(websocket, data)
         except Exception as e:
             logger.error(f"Error in _handle_heartbeat: {str(e)}", exc_info=True)
             raise
@@ -439,39 +609,152 @@ class WebSocketHandler:
                     logger.debug("WebSocket is already disconnected, not sending error message")
                     return
             
-            error = {
-                "meta": {
-                    "message_id": str(uuid.uuid4()),
-                    "sender": self.authed.agent_id,
-                    "recipient": sender_id,
-                    "timestamp": self._get_iso_timestamp(),
-                    "sequence": 0,
-                    "channel_id": "error",
-                    "reply_to": reply_to
-                },
-                "content": {
-                    "type": MessageType.ERROR,
-                    "data": {
-                        "message": error_message
-                    }
-                }
-            }
+            data = self._encode_response(_error_content(error_message), 0, sender_id, "error", reply_to)
             
             # Record outgoing message if in test mode
             if _TESTING:
-                record_outgoing(error, self.authed.agent_id, sender_id)
+                record_outgoing(loads(data), self.authed.agent_id, sender_id)
             
-            # Check if this is a FastAPI WebSocket (has send_json method)
-            if hasattr(websocket, 'send_json'):
-                await websocket.send_json(error)
-            elif hasattr(websocket, 'send_text'):
-                await websocket.send_text(json.dumps(error))
-            else:
-                # Fallback to standard WebSocket
-                await websocket.send(json.dumps(error))
+            await self._send_bytes(websocket, data)
         except Exception as e:
             logger.error(f"Error sending error message: {str(e)}", exc_info=True)
         
+    def _encode_response(self, content: bytes, sequence: int, recipient, channel_id, reply_to) -> bytes:
+        """Serialize a response envelope around pre-encoded content.
+        
+        Args:
+            content: The serialized content object
+            sequence: Sequence number of the response
+            recipient: ID of the agent being answered
+            channel_id: Channel the response belongs to
+            reply_to: ID of the message being answered
+            
+        Returns:
+            bytes: The serialized message
+        """
+        agent_id = self.authed.agent_id
+        if agent_id != self._sender_id:
+            self._sender_id = agent_id
+            self._sender_json = dumps_compact(agent_id)
+        return _RESPONSE_TEMPLATE % (
+            self._new_id().encode('ascii'),
+            self._sender_json,
+            dumps_compact(recipient),
+            self._get_iso_timestamp().encode('ascii'),
+            sequence,
+            dumps_compact(channel_id),
+            dumps_compact(reply_to),
+            content
+        )
+        
+    async def _send(self, websocket, message):
+        """Serialize a message once and queue it for the connection's writer."""
+        await self._send_bytes(websocket, dumps_compact(message))
+        
+    async def _send_bytes(self, websocket, data: bytes):
+        """Queue an already serialized message for the connection's writer."""
+        connection = self._connections.get(websocket)
+        if connection is None:
+            await self._send_frame(websocket, data)
+            return
+        
+        if connection.writer_task.done():
+            # Surface the error that stopped the writer, as a direct send would
+            connection.writer_task.result()
+            raise RuntimeError("WebSocket writer has stopped")
+        await connection.send_queue.put(data)
+        
+    async def _writer_loop(self, websocket, queue, sock=None):
+        """Send queued messages, writing pending ones back to back.
+        
+        Every message is sent as its own frame holding one JSON object, so
+        clients see the same frames as with direct sends. A None item
+        flushes and stops the loop. When the TCP socket is available, a
+        batch is written with the socket corked so its frames leave in full
+        segments rather than one small packet per message.
+        """
+        while True:
+            data = await queue.get()
+            if data is None:
+                return
+            
+            batch = [data]
+            stop = False
+            while len(batch) < _MAX_BATCH and not queue.empty():
+                data = queue.get_nowait()
+                if data is None:
+                    stop = True
+                    break
+                batch.append(data)
+            
+            if len(batch) == 1:
+                await self._send_frame(websocket, batch[0])
+            else:
+                self._set_cork(sock, True)
+                try:
+                    for data in batch:
+                        await self._send_frame(websocket, data)
+                finally:
+                    self._set_cork(sock, False)
+            if stop:
+                return
+        
+    async def _send_frame(self, websocket, data: bytes):
+        """Send one serialized frame as a text frame."""
+        if hasattr(websocket, 'send_text'):
+            # FastAPI WebSocket
+            await websocket.send_text(data.decode('utf-8'))
+        elif _accepts_keyword(type(websocket), 'send', 'text'):
+            # websockets >= 14 asyncio API; bytes with text=True are sent as a
+            # text frame without a decode/encode round trip
+            await websocket.send(data, text=True)
+        else:
+            # Legacy websockets protocol, which sends bytes as a binary frame
+            await websocket.send(data.decode('utf-8'))
+        
+    @staticmethod
+    def _tcp_socket(websocket) -> Optional[socket.socket]:
+        """Get the connection's TCP socket and disable Nagle's algorithm on it.
+        
+        Returns None when the transport is not exposed (e.g. behind ASGI).
+        """
+        transport = getattr(websocket, 'transport', None)
+        if transport is None:
+            return None
+        sock = transport.get_extra_info('socket')
+        if sock is None or sock.family not in (socket.AF_INET, socket.AF_INET6):
+            return None
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            return None
+        return sock
+        
+    @staticmethod
+    def _set_cork(sock: Optional[socket.socket], enabled: bool):
+        """Cork or uncork a TCP socket; uncorking flushes any partial segment."""
+        if sock is None or _CORK_OPTION is None:
+            return
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, _CORK_OPTION, 1 if enabled else 0)
+        except OSError:
+            pass
+        
+    def _new_id(self) -> str:
+        """Get a unique message ID for an outgoing response."""
+        if _UUID_MESSAGE_IDS:
+            return str(uuid.uuid4())
+        return f"{self._id_prefix}:{next(self._msg_seq)}"
+        
     def _get_iso_timestamp(self):
-        """Get current time as ISO 8601 string."""
-        return datetime.now(timezone.utc).isoformat() 
\ No newline at end of file
+        """Get current time as ISO 8601 string.
+        
+        The formatted string is reused for all calls within the same
+        millisecond.
+        """
+        now = time.time()
+        tick = int(now * 1000)
+        if tick != self._ts_tick:
+            self._ts_tick = tick
+            self._ts_str = datetime.fromtimestamp(now, timezone.utc).isoformat()
+        return self._ts_str 
\ No newline at end of file
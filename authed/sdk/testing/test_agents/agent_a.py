@@ -207,4 +207,5 @@ async def connect_to_agent_b():
 
 # Run the server
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=PORT) 
\ No newline at end of file
+    # Replies are small JSON frames, which compression only slows down
+    uvicorn.run(app, host="0.0.0.0", port=PORT, ws_per_message_deflate=False) 
\ No newline at end of file
@@ -64,6 +64,16 @@ class LogService:
         self.logger.addHandler(handler)
         self.logger.setLevel(self.settings.LOG_LEVEL)
 
+    def is_enabled(self, level: LogLevel = LogLevel.INFO) -> bool:
+        """Check whether events at `level` pass the configured log level.
+        
+        Lets callers skip building event details that would be filtered out.
+        Audit events are always enabled.
+        """
+        if level == LogLevel.AUDIT:
+            return True
+        return self.logger.isEnabledFor(logging.getLevelName(LogLevel(level).value.upper()))
+
     def log_event(
         self,
         event_type: str,
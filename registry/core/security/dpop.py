@@ -2,7 +2,9 @@ import hmac
 import hashlib
 import uuid
 from datetime import datetime, timezone
+from functools import lru_cache
 from urllib.parse import urlparse
+from cryptography.hazmat.primitives import serialization
 from jwt import decode as jwt_decode, get_unverified_header
 from jwt.exceptions import InvalidTokenError
 
@@ -11,6 +13,11 @@ from ..logging.logging import log_service
 from ..logging.models import LogLevel
 from ...db.redis import get_redis_client
 from ...utils.validation import validate_url, validate_method
+from ...utils.cache import TTLCache
+
+# Proofs are only accepted within MAX_CLOCK_SKEW of their iat, so a verified
+# proof only needs to be remembered for twice that long
+VERIFIED_PROOF_TTL = 600
 
 def normalize_url(url: str) -> str:
     """Normalize URL for comparison"""
@@ -39,12 +46,26 @@ def normalize_url(url: str) -> str:
     # Always use HTTPS for comparison since middleware enforces it
     return f"https://{netloc}{port}{parsed.path}"
 
+@lru_cache(maxsize=1024)
+def load_public_key(pem: str):
+    """Parse a PEM public key, reusing the key object for repeated PEMs.
+    
+    Agents sign every proof with the same key, so parsing it once saves a
+    PEM decode and key construction on each verification.
+    """
+    return serialization.load_pem_public_key(pem.encode())
+
 class DPoPVerifier:
+    # Hashes of proofs that passed verification in this process. A proof's
+    # nonce is single-use, so a repeat can be rejected before checking its
+    # signature.
+    _verified_proofs = TTLCache(maxsize=50_000, ttl=VERIFIED_PROOF_TTL)
+
     def __init__(self):
         self.redis = get_redis_client()
         self.nonce_prefix = "dpop_nonce:"
         self.settings = get_settings()
-        self.ALLOWED_ALGORITHMS = ["RS256"]
+        self.ALLOWED_ALGORITHMS = ["RS256", "EdDSA"]
         self.MAX_CLOCK_SKEW = 300  # 5 minutes
     
     def hash_dpop_proof(self, proof: str) -> str:
@@ -68,6 +89,15 @@ class DPoPVerifier:
                 )
                 return False
             
+            proof_hash = self.hash_dpop_proof(proof)
+            if proof_hash in self._verified_proofs:
+                log_service.log_event(
+                    "dpop_verification_error",
+                    {"error": "DPoP proof has already been used"},
+                    level=LogLevel.ERROR
+                )
+                return False
+            
             if not validate_method(http_method):
                 log_service.log_event(
                     "invalid_method",
@@ -126,7 +156,7 @@ class DPoPVerifier:
             try:
                 decoded_proof = jwt_decode(
                     proof,
-                    dpop_public_key,
+                    load_public_key(dpop_public_key),
                     algorithms=self.ALLOWED_ALGORITHMS,
                     options={"verify_signature": True}  # Always verify signature
                 )
@@ -183,6 +213,7 @@ class DPoPVerifier:
                 )
                 return False
             
+            self._verified_proofs.set(proof_hash, True)
             return True
             
         except Exception as e:
@@ -3,7 +3,21 @@ Database migrations package.
 This package contains scripts to update the database schema.
 """
 
-from registry.db.migrations.add_claimed_to_providers import run_migration as add_claimed_to_providers
-from registry.db.migrations.make_provider_name_nullable import run_migration as make_provider_name_nullable
+import importlib
 
-__all__ = ['add_claimed_to_providers', 'make_provider_name_nullable'] 
\ No newline at end of file
+# Migration modules, in the order they are applied
+MIGRATIONS = ('add_claimed_to_providers', 'make_provider_name_nullable')
+
+# Each migration's run_migration(), exported as <module name>_run so the
+# module names keep referring to the modules themselves
+__all__ = ['add_claimed_to_providers_run', 'make_provider_name_nullable_run']
+
+def load_migration(name):
+    """Import a migration module by name."""
+    return importlib.import_module(f"{__name__}.{name}")
+
+def __getattr__(name):
+    # Load a migration's run_migration() on first access
+    if name in __all__:
+        return load_migration(name[:-len('_run')]).run_migration
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
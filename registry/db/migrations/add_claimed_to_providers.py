@@ -3,41 +3,52 @@ Migration script to add the claimed column to the providers table.
 This script should be run once to update the database schema.
 """
 
+from typing import Dict
+
 from sqlalchemy import text
-from registry.db.session import engine, SessionLocal
+from sqlalchemy.engine import Connection
+from registry.db.session import engine
+
+def pending(columns: Dict[str, str]) -> bool:
+    """Check whether the providers table still lacks the claimed column.
+    
+    Args:
+        columns: The providers table's column names, mapped to is_nullable
+    """
+    return "claimed" not in columns
+
+def upgrade(connection: Connection):
+    """Add the claimed column with a default value of False"""
+    connection.execute(text("""
+        ALTER TABLE providers
+        ADD COLUMN claimed BOOLEAN NOT NULL DEFAULT FALSE
+    """))
 
 def run_migration():
     """Run the migration to add the claimed column to the providers table"""
     print("Starting migration: Add claimed column to providers table")
     
-    db = SessionLocal()
     try:
-        # Check if the column already exists
-        result = db.execute(text("""
-            SELECT column_name 
-            FROM information_schema.columns 
-            WHERE table_name = 'providers' AND column_name = 'claimed'
-        """))
+        with engine.begin() as connection:
+            # Check if the column already exists
+            result = connection.execute(text("""
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_schema = current_schema()
+                AND table_name = 'providers' AND column_name = 'claimed'
+            """))
+            
+            if result.fetchone():
+                print("Column 'claimed' already exists in the providers table. Skipping migration.")
+                return
+            
+            upgrade(connection)
         
-        if result.fetchone():
-            print("Column 'claimed' already exists in the providers table. Skipping migration.")
-            return
-        
-        # Add the claimed column with a default value of False
-        db.execute(text("""
-            ALTER TABLE providers 
-            ADD COLUMN claimed BOOLEAN NOT NULL DEFAULT FALSE
-        """))
-        
-        db.commit()
         print("Successfully added 'claimed' column to providers table")
-        
+    
     except Exception as e:
-        db.rollback()
         print(f"Error running migration: {str(e)}")
         raise
-    finally:
-        db.close()
 
 if __name__ == "__main__":
     run_migration() 
\ No newline at end of file
@@ -4,58 +4,51 @@ This migration modifies the providers table to make the name and contact_email c
 aligning with the updated Pydantic models where these fields are optional.
 """
 
-from sqlalchemy import MetaData, Table, Column, String, text
-from sqlalchemy.engine import Engine
+from typing import Dict
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
 
 from ...db import engine
 
-def upgrade(engine: Engine):
-    """Upgrade: Make name and contact_email columns nullable"""
-    metadata = MetaData()
-    metadata.reflect(bind=engine)
-    
-    # Get the providers table
-    providers = Table('providers', metadata, extend_existing=True)
+def pending(columns: Dict[str, str]) -> bool:
+    """Check whether name or contact_email is still NOT NULL.
     
-    # Modify the columns to be nullable
-    with engine.begin() as connection:
-        connection.execute(
-            text('ALTER TABLE providers ALTER COLUMN name DROP NOT NULL')
-        )
-        connection.execute(
-            text('ALTER TABLE providers ALTER COLUMN contact_email DROP NOT NULL')
-        )
+    Args:
+        columns: The providers table's column names, mapped to is_nullable
+    """
+    return columns.get("name") == "NO" or columns.get("contact_email") == "NO"
+
+def upgrade(connection: Connection):
+    """Upgrade: Make name and contact_email columns nullable"""
+    # Both columns are altered in one statement, so the table lock is only
+    # taken once
+    connection.execute(
+        text('ALTER TABLE providers ALTER COLUMN name DROP NOT NULL, ALTER COLUMN contact_email DROP NOT NULL')
+    )
 
-def downgrade(engine: Engine):
+def downgrade(connection: Connection):
     """Downgrade: Make name and contact_email columns NOT NULL again"""
-    metadata = MetaData()
-    metadata.reflect(bind=engine)
-    
-    # Get the providers table
-    providers = Table('providers', metadata, extend_existing=True)
-    
-    # Modify the columns to be NOT NULL
-    with engine.begin() as connection:
-        # First set any NULL values to default values to avoid constraint violation
-        connection.execute(
-            text("UPDATE providers SET name = 'unnamed-provider-' || id WHERE name IS NULL")
-        )
-        connection.execute(
-            text("UPDATE providers SET contact_email = 'no-email-' || id || '@placeholder.com' WHERE contact_email IS NULL")
-        )
-        # Then add the NOT NULL constraints
-        connection.execute(
-            text('ALTER TABLE providers ALTER COLUMN name SET NOT NULL')
-        )
-        connection.execute(
-            text('ALTER TABLE providers ALTER COLUMN contact_email SET NOT NULL')
+    # First set any NULL values to default values to avoid constraint violation
+    connection.execute(
+        text(
+            "UPDATE providers SET "
+            "name = COALESCE(name, 'unnamed-provider-' || id), "
+            "contact_email = COALESCE(contact_email, 'no-email-' || id || '@placeholder.com') "
+            "WHERE name IS NULL OR contact_email IS NULL"
         )
+    )
+    # Then add the NOT NULL constraints
+    connection.execute(
+        text('ALTER TABLE providers ALTER COLUMN name SET NOT NULL, ALTER COLUMN contact_email SET NOT NULL')
+    )
 
 def run_migration():
     """Run the migration"""
     print("Starting migration: Make provider fields nullable")
     try:
-        upgrade(engine)
+        with engine.begin() as connection:
+            upgrade(connection)
         print("Successfully made provider fields nullable")
     except Exception as e:
         print(f"Error making provider fields nullable: {str(e)}")
@@ -3,17 +3,42 @@ Script to run all database migrations.
 This script should be run once to update the database schema.
 """
 
-from registry.db.migrations import add_claimed_to_providers, make_provider_name_nullable
+import logging
+
+from sqlalchemy import text
+
+from registry.db import migrations
+from registry.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+# Current shape of the providers table, read in one query
+_PROVIDER_COLUMNS = text("""
+    SELECT column_name, is_nullable
+    FROM information_schema.columns
+    WHERE table_schema = current_schema() AND table_name = 'providers'
+""")
 
 def run_all_migrations():
-    """Run all database migrations"""
-    print("Starting database migrations")
-    
-    # Run migrations in order
-    add_claimed_to_providers()
-    make_provider_name_nullable()
-    
-    print("All migrations completed successfully")
+    """Run all database migrations.
+
+    Each migration module's pending() is checked against the providers
+    columns, and the upgrade() of every pending one is applied in a single
+    transaction; migrations already present in the schema are skipped, so
+    re-runs take no locks.
+    """
+    with engine.begin() as connection:
+        columns = dict(connection.execute(_PROVIDER_COLUMNS).fetchall())
+        if not columns:
+            # No providers table yet; it is created from the current models
+            return
+
+        for name in migrations.MIGRATIONS:
+            migration = migrations.load_migration(name)
+            if migration.pending(columns):
+                logger.info(f"Applying migration: {name}")
+                migration.upgrade(connection)
 
 if __name__ == "__main__":
-    run_all_migrations() 
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO)
+    run_all_migrations()
@@ -36,7 +36,7 @@ AgentPermission = None
 PermissionType = None
 
 # Constants
-KEY_MIN_LENGTH = 128
+KEY_MIN_LENGTH = 100  # Ed25519 PEM public keys are ~113 characters
 KEY_MAX_LENGTH = 2048
 NAME_PATTERN = r"^[a-zA-Z0-9_-]{3,50}$"
 
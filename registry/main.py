@@ -1,5 +1,8 @@
+import logging
+import ssl
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
+from cryptography.hazmat.backends.openssl.backend import backend as openssl_backend
 from .api import init_api
 from .api.middleware.security import SecurityMiddleware
 from .api.middleware.auth import AuthMiddleware
@@ -7,9 +10,19 @@ from .api.middleware.rate_limit import RateLimitMiddleware
 from .api.middleware.cors import CORSMiddleware
 from .db import initialize_models
 
+logger = logging.getLogger(__name__)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # SHA-256 (token signing digests and DPoP proof hashes) runs in OpenSSL,
+    # which uses the CPU's SHA extensions when present; record which builds
+    # are in use so slow hosts can be traced to an old library
+    logger.info(
+        "Crypto backends: cryptography %s, hashlib %s",
+        openssl_backend.openssl_version_text(),
+        ssl.OPENSSL_VERSION
+    )
     # Initialize database with all models
     initialize_models()
     # Then initialize the app
@@ -1,9 +1,10 @@
 import re
 from datetime import datetime
 from enum import Enum
+from functools import cached_property
 from uuid import UUID
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
 from typing_extensions import Annotated
 
 from pydantic import (
@@ -20,7 +21,7 @@ from ..utils.validation import sanitize_string, validate_public_key
 
 
 # Constants
-KEY_MIN_LENGTH = 128
+KEY_MIN_LENGTH = 100  # Ed25519 PEM public keys are ~113 characters
 KEY_MAX_LENGTH = 2048
 NAME_PATTERN = r"^[a-zA-Z0-9_-]{3,50}$"
 
@@ -98,6 +99,36 @@ class Agent(BaseModel):
             return validate_public_key(v)
         return v
 
+    @cached_property
+    def allowed_targets(self) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+        """IDs this agent grants access to, as (agent IDs, provider IDs).
+        
+        Built from `permissions` on first use, so membership checks are O(1).
+        """
+        allowed_agents = frozenset(
+            p.target_id for p in self.permissions if p.type == PermissionType.ALLOW_AGENT
+        )
+        allowed_providers = frozenset(
+            p.target_id for p in self.permissions if p.type == PermissionType.ALLOW_PROVIDER
+        )
+        return allowed_agents, allowed_providers
+
+    @cached_property
+    def permission_check(self) -> Callable[[str, str], bool]:
+        """Checker for whether this agent allows a (agent ID, provider ID) pair.
+        
+        Specialized once to the kinds of permissions the agent actually has,
+        so agents without provider (or agent) grants skip that lookup.
+        """
+        allowed_agents, allowed_providers = self.allowed_targets
+        if allowed_agents and allowed_providers:
+            return lambda agent_id, provider_id: agent_id in allowed_agents or provider_id in allowed_providers
+        if allowed_agents:
+            return lambda agent_id, provider_id: agent_id in allowed_agents
+        if allowed_providers:
+            return lambda agent_id, provider_id: provider_id in allowed_providers
+        return lambda agent_id, provider_id: False
+
     def model_post_init(self, __context) -> None:
         if self.dpop_public_key and not self.dpop_public_key.startswith('20'):
             self.dpop_public_key = field_encryption.encrypt_field(self.dpop_public_key)
@@ -176,6 +176,10 @@ class AgentService:
             db.delete(db_agent)
             db.commit()
             
+            # Drop cached permission checks involving the agent
+            from .token_service import TokenService
+            TokenService.invalidate(agent_id)
+            
             return True
             
         except Exception as e:
@@ -267,6 +271,37 @@ class AgentService:
         finally:
             db.close()
 
+    def get_agents(self, agent_ids: List[str]) -> Dict[str, Agent]:
+        """Get several agents with a single query
+        
+        Args:
+            agent_ids: IDs of the agents to load
+            
+        Returns:
+            Dict mapping each found agent ID to its Agent; missing IDs are absent
+        """
+        db = SessionLocal()
+        try:
+            agents_db = db.query(AgentDB).filter(
+                AgentDB.agent_id.in_(agent_ids)
+            ).all()
+            
+            return {
+                str(agent_db.agent_id): Agent(
+                    agent_id=agent_db.agent_id,
+                    name=agent_db.name,
+                    provider_id=agent_db.provider_id,
+                    dpop_public_key=agent_db.dpop_public_key,
+                    hashed_secret=agent_db.hashed_secret,
+                    created_at=agent_db.created_at,
+                    updated_at=agent_db.updated_at,
+                    permissions=agent_db.permissions or []
+                )
+                for agent_db in agents_db
+            }
+        finally:
+            db.close()
+
     def list_agents(
         self,
         skip: int = 0,
@@ -63,6 +63,10 @@ class PermissionService:
             agent.updated_at = datetime.now(timezone.utc)
             db.commit()
             
+            # Drop cached permission checks involving the agent
+            from .token_service import TokenService
+            TokenService.invalidate(agent_id)
+            
             # Decrypt sensitive fields before converting to Agent model
             if agent.dpop_public_key:
                 agent.dpop_public_key = encryption_manager.decrypt_field(agent.dpop_public_key)
@@ -119,6 +123,10 @@ class PermissionService:
             agent.updated_at = datetime.now(timezone.utc)
             db.commit()
             
+            # Drop cached permission checks involving the agent
+            from .token_service import TokenService
+            TokenService.invalidate(agent_id)
+            
             # Decrypt sensitive fields before converting to Agent model
             try:
                 if agent.dpop_public_key:
@@ -194,6 +202,10 @@ class PermissionService:
             agent.updated_at = datetime.now(timezone.utc)
             db.commit()
             
+            # Drop cached permission checks involving the agent
+            from .token_service import TokenService
+            TokenService.invalidate(agent_id)
+            
             # Decrypt sensitive fields before converting to Agent model
             if agent.dpop_public_key:
                 agent.dpop_public_key = encryption_manager.decrypt_field(agent.dpop_public_key)
@@ -1,7 +1,16 @@
+import base64
+import json
+import logging
+import secrets
+import time
+from functools import lru_cache
 import jwt
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, padding, rsa
 from datetime import datetime, timedelta, timezone
-from typing import Optional, List
-from uuid import UUID, uuid4
+from typing import Optional
+from uuid import UUID
 
 
 from .. import models
@@ -12,10 +21,22 @@ from ..core.security.key_manager import KeyManager
 from ..core.security.dpop import DPoPVerifier
 from ..services.agent_service import AgentService
 from ..core.security.encryption import EncryptionManager
+from ..utils.cache import TTLCache
+from ..utils.pem import canonical_public_key_pem
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Use RS256 (RSA + SHA-256)
 JWT_ALGORITHM = "RS256"
 
+# Seconds a permission check result is reused before agents are reloaded
+PERMISSION_CACHE_TTL = 60
+
+logger = logging.getLogger(__name__)
+
 # Get settings
 settings = get_settings()
 
@@ -24,39 +45,171 @@ dpop_verifier = DPoPVerifier()
 REGISTRY_PRIVATE_KEY = key_manager.get_private_key()
 REGISTRY_PUBLIC_KEY = key_manager.get_public_key()
 field_encryption = EncryptionManager()
+agent_service = AgentService()
+
+def _b64url(data: bytes) -> bytes:
+    """Base64url-encode without padding, as JWS requires."""
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+# Encoded JWS header of every interaction token (PyJWT's sorted, compact form)
+_RS256_HEADER_B64 = _b64url(json.dumps({"alg": JWT_ALGORITHM, "typ": "JWT"}, separators=(",", ":")).encode())
+_RS256_PADDING = padding.PKCS1v15()
+_RS256_HASH = hashes.SHA256()
+
+def _encode_rs256(payload: dict) -> str:
+    """Sign a JWT payload with the registry key using RS256.
+    
+    Produces the same token as jwt.encode(payload, REGISTRY_PRIVATE_KEY,
+    algorithm="RS256") but signs with the loaded key object directly,
+    skipping PyJWT's per-call header handling and key checks. The payload
+    is serialized with orjson when it is installed.
+    """
+    if orjson is not None:
+        payload_json = orjson.dumps(payload)
+    else:
+        payload_json = json.dumps(payload, separators=(",", ":")).encode()
+    body = _b64url(payload_json)
+    signing_input = _RS256_HEADER_B64 + b"." + body
+    signature = REGISTRY_PRIVATE_KEY.sign(signing_input, _RS256_PADDING, _RS256_HASH)
+    return (signing_input + b"." + _b64url(signature)).decode("ascii")
+
+@lru_cache(maxsize=8192)
+def _decrypt_dpop_key(ciphertext: str) -> str:
+    """Decrypt the DPoP public key embedded in an interaction token.
+    
+    Each token carries its own ciphertext (Fernet uses a fresh IV), so the
+    cache maps one token's key to its plaintext and saves the decryption
+    when the same token is verified again. Failures are not cached.
+    
+    The key is returned as canonical PEM. Tokens issued before keys were
+    stored as PEM carry the bare base64 body, and stay valid for
+    TOKEN_EXPIRY_MINUTES after a deploy, so both forms are normalized the
+    same way as at creation.
+    """
+    return canonical_public_key_pem(field_encryption.decrypt_field(ciphertext))
+
+def _b64url_decode(data: str) -> bytes:
+    """Decode unpadded base64url, as used in JWKs."""
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _unverified_header(token: str) -> dict:
+    """Decode a JWT's header without checking the token.
+    
+    Only used to read the JWK out of a DPoP proof; the proof itself is
+    verified afterwards by DPoPVerifier.
+    """
+    segment = _b64url_decode(token.split(".", 1)[0])
+    header = orjson.loads(segment) if orjson is not None else json.loads(segment)
+    if not isinstance(header, dict):
+        raise ValueError("Invalid JWT header")
+    return header
+
+def _public_key_pem(public_key) -> str:
+    return public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode('utf-8')
+
+@lru_cache(maxsize=4096)
+def _rsa_jwk_to_pem(n_b64: str, e_b64: str) -> str:
+    """Convert an RSA JWK's modulus and exponent to a PEM public key.
+    
+    Cached because an agent sends the same JWK with every proof.
+    """
+    n = int.from_bytes(_b64url_decode(n_b64), byteorder="big")
+    # Nearly every RSA key uses the standard exponent 65537 ("AQAB")
+    if e_b64 == "AQAB":
+        e = 65537
+    else:
+        e = int.from_bytes(_b64url_decode(e_b64), byteorder="big")
+    return _public_key_pem(rsa.RSAPublicNumbers(e=e, n=n).public_key())
+
+@lru_cache(maxsize=4096)
+def _ed25519_jwk_to_pem(x_b64: str) -> str:
+    """Convert an Ed25519 JWK's public key bytes to a PEM public key."""
+    return _public_key_pem(ed25519.Ed25519PublicKey.from_public_bytes(_b64url_decode(x_b64)))
 
 class TokenService:
-    def __init__(self):
-        """Initialize the token service."""
-        self.dpop_verifier = DPoPVerifier()
-        self.agent_service = AgentService()
-        self.key_manager = KeyManager()
-        self.field_encryption = EncryptionManager()
-        self.settings = get_settings()
+    # Results of _verify_agent_permissions keyed by (requesting, target) agent
+    # ID, shared by all instances
+    _permission_cache = TTLCache(maxsize=10_000, ttl=PERMISSION_CACHE_TTL)
+
+    # Helpers are the module-level instances, so creating a TokenService
+    # does not reload keys or open new Redis and database handles
+    dpop_verifier = dpop_verifier
+    agent_service = agent_service
+    key_manager = key_manager
+    field_encryption = field_encryption
+    settings = settings
 
-    def _check_agent_has_permission(self, agent_permissions: List[models.AgentPermission], target_agent_id: str, target_provider_id: str) -> bool:
+    def _check_agent_has_permission(self, agent: models.Agent, target_agent_id: str, target_provider_id: str) -> bool:
         """Check if an agent has permission for a target (either directly or via provider)."""
-        for perm in agent_permissions:
-            if perm.type == models.PermissionType.ALLOW_AGENT and perm.target_id == target_agent_id:
-                return True
-            if perm.type == models.PermissionType.ALLOW_PROVIDER and perm.target_id == target_provider_id:
-                return True
-        return False
+        return agent.permission_check(target_agent_id, target_provider_id)
 
-    def _verify_agent_permissions(self, requesting_agent_id: UUID, target_agent_id: UUID) -> bool:
-        """Verify that both agents have permissions to interact with each other."""
+    @classmethod
+    def invalidate(cls, agent_id) -> None:
+        """Drop cached permission results involving an agent.
+        
+        Call after the agent's permissions change or the agent is deleted.
+        Only this process's cache is cleared: other workers keep their
+        cached results, so a revocation can take up to PERMISSION_CACHE_TTL
+        seconds to reach them.
+        
+        Args:
+            agent_id: ID of the agent whose results are stale
+        """
+        agent_id = str(agent_id)
+        cls._permission_cache.discard_where(lambda key: agent_id in key)
+
+    def _verify_agent_permissions(
+        self,
+        requesting_agent_id: str,
+        target_agent_id: str,
+        target_agent: Optional[models.Agent] = None
+    ) -> bool:
+        """Verify that both agents have permissions to interact with each other.
+        
+        Results are cached for PERMISSION_CACHE_TTL seconds. Lookups where an
+        agent is not found, and lookup errors, are not cached, so a newly
+        registered agent is not denied by an earlier miss.
+        Each lookup logs the cache's hit and miss counts at DEBUG.
+        
+        Args:
+            requesting_agent_id: ID of the agent requesting the interaction
+            target_agent_id: ID of the agent being contacted
+            target_agent: The target agent, if the caller already loaded it
+        """
+        cache_key = (requesting_agent_id, target_agent_id)
+        cached = self._permission_cache.get(cache_key)
+        if logger.isEnabledFor(logging.DEBUG):
+            cache = self._permission_cache
+            logger.debug(
+                "Permission cache %s for %s -> %s (hits=%d, misses=%d)",
+                "miss" if cached is None else "hit",
+                requesting_agent_id,
+                target_agent_id,
+                cache.hits,
+                cache.misses
+            )
+        if cached is not None:
+            return cached
+        
         try:
-            # Get both agents
-            requesting_agent = self.agent_service.get_agent(str(requesting_agent_id))
-            target_agent = self.agent_service.get_agent(str(target_agent_id))
+            # Get both agents in one lookup, reusing the target if the caller has it
+            if target_agent is None:
+                agents = self.agent_service.get_agents([requesting_agent_id, target_agent_id])
+                requesting_agent = agents.get(requesting_agent_id)
+                target_agent = agents.get(target_agent_id)
+            else:
+                requesting_agent = self.agent_service.get_agent(requesting_agent_id)
             
             if not requesting_agent or not target_agent:
                 log_service.log_event(
                     "permission_check_failed",
                     {
                         "error": "One or both agents not found",
-                        "requesting_agent": str(requesting_agent_id),
-                        "target_agent": str(target_agent_id)
+                        "requesting_agent": requesting_agent_id,
+                        "target_agent": target_agent_id
                     },
                     level=LogLevel.ERROR
                 )
@@ -65,42 +218,45 @@ class TokenService:
             # Check if requesting agent has permission for target
             # (either directly or via provider permission)
             requesting_has_permission = self._check_agent_has_permission(
-                requesting_agent.permissions,
-                str(target_agent_id),
+                requesting_agent,
+                target_agent_id,
                 str(target_agent.provider_id)
             )
             
             # Check if target agent has permission for requester
             # (either directly or via provider permission)
             target_has_permission = self._check_agent_has_permission(
-                target_agent.permissions,
-                str(requesting_agent_id),
+                target_agent,
+                requesting_agent_id,
                 str(requesting_agent.provider_id)
             )
             
             # Log the permission check
-            log_service.log_event(
-                "permission_check",
-                {
-                    "requesting_agent": str(requesting_agent_id),
-                    "requesting_provider": str(requesting_agent.provider_id),
-                    "target_agent": str(target_agent_id),
-                    "target_provider": str(target_agent.provider_id),
-                    "requesting_has_permission": requesting_has_permission,
-                    "target_has_permission": target_has_permission
-                }
-            )
+            if log_service.is_enabled(LogLevel.INFO):
+                log_service.log_event(
+                    "permission_check",
+                    {
+                        "requesting_agent": requesting_agent_id,
+                        "requesting_provider": str(requesting_agent.provider_id),
+                        "target_agent": target_agent_id,
+                        "target_provider": str(target_agent.provider_id),
+                        "requesting_has_permission": requesting_has_permission,
+                        "target_has_permission": target_has_permission
+                    }
+                )
             
             # Both agents must have permissions for each other
-            return requesting_has_permission and target_has_permission
+            allowed = requesting_has_permission and target_has_permission
+            self._permission_cache.set(cache_key, allowed)
+            return allowed
             
         except Exception as e:
             log_service.log_event(
                 "permission_check_error",
                 {
                     "error": str(e),
-                    "requesting_agent": str(requesting_agent_id),
-                    "target_agent": str(target_agent_id)
+                    "requesting_agent": requesting_agent_id,
+                    "target_agent": target_agent_id
                 },
                 level=LogLevel.ERROR
             )
@@ -127,55 +283,58 @@ class TokenService:
             url: The request URL
             expires_delta: Optional custom expiration time
         """
+        sid = str(agent_id)
+        tid = str(target_agent_id)
         try:
             # First verify that both agents have permissions for each other
-            if not self._verify_agent_permissions(agent_id, target_agent_id):
+            if not self._verify_agent_permissions(sid, tid):
                 raise ValueError(
-                    f"Insufficient permissions between agents {agent_id} and {target_agent_id}"
+                    f"Insufficient permissions between agents {sid} and {tid}"
                 )
             
             # Then verify the DPoP proof
             if not self.dpop_verifier.verify_proof(dpop_proof, dpop_public_key, method, url):
                 raise ValueError("Invalid DPoP proof")
             
+            # Claims are whole epoch seconds; a datetime is only built for
+            # the returned token
+            now = int(time.time())
             if expires_delta is None:
-                expires_delta = timedelta(minutes=self.settings.TOKEN_EXPIRY_MINUTES)
-            
-            now = datetime.now(timezone.utc)
-            expires_at = now + expires_delta
-            token_id = str(uuid4())
+                exp = now + self.settings.TOKEN_EXPIRY_MINUTES * 60
+            else:
+                exp = now + int(expires_delta.total_seconds())
+            expires_at = datetime.fromtimestamp(exp, tz=timezone.utc)
+            token_id = secrets.token_hex(16)
             
             # Calculate proof hash for binding
             dpop_hash = self.dpop_verifier.hash_dpop_proof(dpop_proof)
             
-            # Encrypt sensitive data
+            # Encrypt sensitive data; the key is stored as canonical PEM
+            dpop_public_key = canonical_public_key_pem(dpop_public_key)
             encrypted_dpop_key = self.field_encryption.encrypt_field(dpop_public_key)
             
             to_encode = {
-                "sub": str(agent_id),
-                "target": str(target_agent_id),
+                "sub": sid,
+                "target": tid,
                 "dpop_hash": dpop_hash,
                 "dpop_public_key": encrypted_dpop_key,
-                "exp": int(expires_at.timestamp()),
-                "iat": int(now.timestamp()),
+                "exp": exp,
+                "iat": now,
                 "iss": "registry",
                 "jti": token_id,
-                "nbf": int(now.timestamp()),
+                "nbf": now,
                 "typ": "interaction_token"
             }
             
-            encoded_jwt = jwt.encode(
-                to_encode, 
-                REGISTRY_PRIVATE_KEY,
-                algorithm=JWT_ALGORITHM
-            )
+            encoded_jwt = _encode_rs256(to_encode)
             
-            log_service.log_event("token_issued", {
-                "token_id": token_id,
-                "agent_id": str(agent_id),
-                "target_agent_id": str(target_agent_id),
-                "expires_at": expires_at.isoformat()
-            }, level=LogLevel.INFO)
+            if log_service.is_enabled(LogLevel.INFO):
+                log_service.log_event("token_issued", {
+                    "token_id": token_id,
+                    "agent_id": sid,
+                    "target_agent_id": tid,
+                    "expires_at": expires_at.isoformat()
+                }, level=LogLevel.INFO)
             
             return models.InteractionToken(
                 token=encoded_jwt,
@@ -184,16 +343,17 @@ class TokenService:
             )
             
         except Exception as e:
+            error = str(e)
             log_service.log_event(
                 "token_creation_error",
                 {
-                    "error": str(e),
-                    "agent_id": str(agent_id),
-                    "target_agent_id": str(target_agent_id)
+                    "error": error,
+                    "agent_id": sid,
+                    "target_agent_id": tid
                 },
                 level=LogLevel.ERROR
             )
-            raise ValueError(f"Failed to create token: {str(e)}")
+            raise ValueError(f"Failed to create token: {error}")
 
     def verify_token(
         self,
@@ -225,15 +385,18 @@ class TokenService:
                 REGISTRY_PUBLIC_KEY,  # Use the global public key that matches the private key used for signing
                 algorithms=["RS256"]
             )
+            sid = payload["sub"]
+            tid = payload["target"]
             
             # Verify target if provided
-            if expected_target and str(expected_target) != payload["target"]:
+            if expected_target and str(expected_target) != tid:
                 raise ValueError("Target agent ID mismatch")
                 
             # Verify DPoP proof from verifying agent
+            verifying_agent = None
             if dpop_proof and method and url:
                 # Get verifying agent
-                verifying_agent = self.agent_service.get_agent(payload["target"])
+                verifying_agent = self.agent_service.get_agent(tid)
                 if not verifying_agent:
                     raise ValueError("Verifying agent not found")
                     
@@ -246,15 +409,16 @@ class TokenService:
                     if dpop_public_key:
                         try:
                             # Try to decrypt the public key from the token
-                            decrypted_public_key = self.field_encryption.decrypt_field(dpop_public_key)
-                            log_service.log_event(
-                                "dpop_verification_info",
-                                {"message": "Using public key from token payload"}
-                            )
+                            decrypted_public_key = _decrypt_dpop_key(dpop_public_key)
+                            if log_service.is_enabled(LogLevel.INFO):
+                                log_service.log_event(
+                                    "dpop_verification_info",
+                                    {"message": "Using public key from token payload"}
+                                )
                         except Exception as e:
                             log_service.log_event(
                                 "dpop_verification_error",
-                                {"error": f"Failed to decrypt public key from token: {str(e)}"},
+                                {"error": f"Failed to decrypt public key from token: {e}"},
                                 level=LogLevel.ERROR
                             )
                             # If decryption fails, decrypted_public_key remains None
@@ -263,54 +427,38 @@ class TokenService:
                     if not decrypted_public_key:
                         try:
                             # Extract the public key from the DPoP proof's JWK
-                            from jwt import get_unverified_header
-                            header = get_unverified_header(dpop_proof)
+                            header = _unverified_header(dpop_proof)
                             jwk = header.get("jwk")
                             
                             if not jwk:
                                 raise ValueError("No JWK found in DPoP proof header")
                                 
                             # Log the JWK for debugging
-                            log_service.log_event(
-                                "dpop_verification_info",
-                                {"message": "Extracted JWK from DPoP proof", "jwk": jwk}
-                            )
+                            if log_service.is_enabled(LogLevel.INFO):
+                                log_service.log_event(
+                                    "dpop_verification_info",
+                                    {"message": "Extracted JWK from DPoP proof", "jwk": jwk}
+                                )
                             
                             # Convert JWK to PEM format
-                            from cryptography.hazmat.primitives.asymmetric import rsa
-                            from cryptography.hazmat.primitives import serialization
-                            import base64
-                            
-                            # Decode the modulus and exponent
-                            n = int.from_bytes(base64.urlsafe_b64decode(jwk["n"] + "=" * (4 - len(jwk["n"]) % 4)), byteorder="big")
-                            e = int.from_bytes(base64.urlsafe_b64decode(jwk["e"] + "=" * (4 - len(jwk["e"]) % 4)), byteorder="big")
+                            if jwk.get("kty") == "OKP" and jwk.get("crv") == "Ed25519":
+                                decrypted_public_key = _ed25519_jwk_to_pem(jwk["x"])
+                            else:
+                                decrypted_public_key = _rsa_jwk_to_pem(jwk["n"], jwk["e"])
                             
-                            # Create the public key
-                            public_numbers = rsa.RSAPublicNumbers(e=e, n=n)
-                            public_key = public_numbers.public_key()
-                            
-                            # Convert to PEM format
-                            decrypted_public_key = public_key.public_bytes(
-                                encoding=serialization.Encoding.PEM,
-                                format=serialization.PublicFormat.SubjectPublicKeyInfo
-                            ).decode('utf-8')
-                            
-                            log_service.log_event(
-                                "dpop_verification_info",
-                                {"message": "Successfully converted JWK to PEM"}
-                            )
+                            if log_service.is_enabled(LogLevel.INFO):
+                                log_service.log_event(
+                                    "dpop_verification_info",
+                                    {"message": "Successfully converted JWK to PEM"}
+                                )
                         except Exception as e:
                             log_service.log_event(
                                 "dpop_verification_error",
-                                {"error": f"Failed to extract public key from DPoP proof: {str(e)}"},
+                                {"error": f"Failed to extract public key from DPoP proof: {e}"},
                                 level=LogLevel.ERROR
                             )
                             raise ValueError("Failed to extract public key from DPoP proof")
                     
-                    # Ensure proper PEM format
-                    if decrypted_public_key and not decrypted_public_key.startswith('-----BEGIN PUBLIC KEY-----'):
-                        decrypted_public_key = f"-----BEGIN PUBLIC KEY-----\n{decrypted_public_key}\n-----END PUBLIC KEY-----"
-                    
                     # Verify the DPoP proof
                     if not decrypted_public_key or not self.dpop_verifier.verify_proof(
                         dpop_proof,
@@ -321,23 +469,25 @@ class TokenService:
                         raise ValueError("Invalid DPoP proof from verifying agent")
                         
                 except Exception as e:
+                    error = str(e)
                     log_service.log_event(
                         "dpop_verification_error",
-                        {"error": f"Failed to verify DPoP proof: {str(e)}"},
+                        {"error": f"Failed to verify DPoP proof: {error}"},
                         level=LogLevel.ERROR
                     )
-                    raise ValueError(f"Could not verify DPoP proof: {str(e)}")
+                    raise ValueError(f"Could not verify DPoP proof: {error}")
             
             # Verify permissions are still valid
             if not self._verify_agent_permissions(
-                UUID(payload["sub"]),
-                UUID(payload["target"])
+                sid,
+                tid,
+                target_agent=verifying_agent
             ):
                 raise ValueError("Agent permissions have been revoked")
                 
             return payload
             
         except jwt.InvalidTokenError as e:
-            raise ValueError(f"Invalid token: {str(e)}")
+            raise ValueError(f"Invalid token: {e}")
         except Exception as e:
-            raise ValueError(f"Token verification failed: {str(e)}") 
\ No newline at end of file
+            raise ValueError(f"Token verification failed: {e}") 
\ No newline at end of file
@@ -1,7 +1,11 @@
 from .validation import validate_url, validate_method, validate_agent_id
 from .uri import URI, is_uri
+from .cache import TTLCache
+from .pem import canonical_public_key_pem
 
 __all__ = [
     'validate_url', 'validate_method', 'validate_agent_id',
-    'URI', 'is_uri'
+    'URI', 'is_uri',
+    'TTLCache',
+    'canonical_public_key_pem'
 ] 
\ No newline at end of file
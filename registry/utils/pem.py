@@ -0,0 +1,31 @@
+"""Helpers for PEM-encoded public keys."""
+
+import re
+
+PEM_HEADER = "-----BEGIN PUBLIC KEY-----"
+PEM_FOOTER = "-----END PUBLIC KEY-----"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def canonical_public_key_pem(key: str) -> str:
+    """Normalize a public key to one canonical PEM text.
+
+    Accepts a full PEM or just its base64 body, as interaction tokens issued
+    before keys were stored as PEM carry it, with any line breaks. Both forms
+    of the same key give the same text: the header, the body in 64-character
+    lines and the footer.
+
+    Args:
+        key: The public key, as PEM or bare base64
+
+    Returns:
+        str: The canonical PEM
+    """
+    body = key.strip()
+    if body.startswith(PEM_HEADER):
+        body = body[len(PEM_HEADER):]
+    if body.endswith(PEM_FOOTER):
+        body = body[:-len(PEM_FOOTER)]
+    body = _WHITESPACE_RE.sub("", body)
+    lines = [body[i:i + 64] for i in range(0, len(body), 64)]
+    return "\n".join([PEM_HEADER, *lines, PEM_FOOTER]) + "\n"
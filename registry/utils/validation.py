@@ -8,7 +8,7 @@ from .uri import is_uri
 
 # Constants for validation
 NAME_PATTERN = r"^[a-zA-Z0-9\s_-]{3,50}$"
-KEY_MIN_LENGTH = 128  # Minimum length for public keys
+KEY_MIN_LENGTH = 100  # Minimum length for public keys (Ed25519 PEM is ~113)
 KEY_MAX_LENGTH = 2048  # Maximum length for public keys
 
 def sanitize_string(value: str, pattern: str, max_length: int = 50) -> str:
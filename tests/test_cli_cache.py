@@ -0,0 +1,136 @@
+"""Tests for the CLI's cached readers, file writer and key pool."""
+
+import io
+import json
+import os
+import stat
+
+import pytest
+from dotenv import dotenv_values
+
+from authed.cli.utils import keys
+from authed.cli.utils.cache import clear_cache, load_config_cached, load_env_cached
+from authed.cli.utils.env import parse_env
+from authed.cli.utils.files import atomic_write_text
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    clear_cache()
+    yield
+    clear_cache()
+
+def touch_later(path, seconds=5):
+    """Move a file's mtime forward, as a later write would."""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + seconds * 10**9))
+
+def test_config_cache_reuses_unchanged_file(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"provider_id": "a"}))
+
+    assert load_config_cached(path) is load_config_cached(path)
+
+def test_config_cache_reloads_on_size_change(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"provider_id": "a"}))
+    assert load_config_cached(path) == {"provider_id": "a"}
+
+    path.write_text(json.dumps({"provider_id": "abc"}))
+    assert load_config_cached(path) == {"provider_id": "abc"}
+
+def test_config_cache_reloads_on_mtime_change(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"provider_id": "a"}))
+    assert load_config_cached(path) == {"provider_id": "a"}
+
+    # Same size, so only the modification time tells the versions apart
+    path.write_text(json.dumps({"provider_id": "b"}))
+    touch_later(path)
+    assert load_config_cached(path) == {"provider_id": "b"}
+
+def test_env_cache_reloads_on_change(tmp_path):
+    path = tmp_path / ".env"
+    path.write_text("KEY=one\n")
+    assert load_env_cached(path) == {"KEY": "one"}
+
+    path.write_text("KEY=two\n")
+    touch_later(path)
+    assert load_env_cached(path) == {"KEY": "two"}
+
+    path.write_text("KEY=three\n")
+    assert load_env_cached(path) == {"KEY": "three"}
+
+def test_atomic_write_keeps_existing_mode(tmp_path):
+    path = tmp_path / ".env"
+    path.write_text("OLD=1\n")
+    os.chmod(path, 0o640)
+
+    atomic_write_text(path, "NEW=1\n")
+
+    assert path.read_text() == "NEW=1\n"
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    assert os.listdir(tmp_path) == [".env"]
+
+def test_atomic_write_creates_private_file(tmp_path):
+    path = tmp_path / "config.json"
+
+    atomic_write_text(path, "{}")
+
+    assert path.read_text() == "{}"
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+ENV_SAMPLES = [
+    "KEY=value\n",
+    "KEY=value",
+    "  export KEY = spaced  \n",
+    "KEY=value # comment\nOTHER=value#not-a-comment\n",
+    "KEY= # only a comment\n",
+    "EMPTY=\nNEXT=1\n",
+    "URL=postgres://${USER}:${PASS}@db/app\n",
+    "SINGLE='literal $HOME \\n \\\\ \\' end'\n",
+    'DOUBLE="tab\\tnew\\nline \\"quoted\\" \\\\ \\$keep"\n',
+    'MULTI="-----BEGIN KEY-----\nabc\n-----END KEY-----"\nAFTER=1\n',
+    "QUOTED='value' # comment\n",
+    "WIN=C:\\Users\\app\n",
+    "# comment only\n\nKEY=1\r\nOTHER=2\r\n",
+    "DUP=1\nDUP=2\n",
+]
+
+@pytest.mark.parametrize("text", ENV_SAMPLES)
+def test_fallback_parser_matches_dotenv(text):
+    expected = {
+        key: value
+        for key, value in dotenv_values(stream=io.StringIO(text), interpolate=False).items()
+        if value is not None
+    }
+    assert parse_env(text) == expected
+
+@pytest.fixture
+def keypool(tmp_path, monkeypatch):
+    pool = tmp_path / "keypool"
+    monkeypatch.setattr(keys, "KEYPOOL_DIR", pool)
+    monkeypatch.setattr(keys, "_keypool_spawn_refill", lambda size=keys.KEYPOOL_SIZE: None)
+    return pool
+
+def test_keypool_take_from_empty_pool(keypool):
+    assert keys._keypool_take() is None
+
+def test_keypool_refill_and_take(keypool):
+    keys._keypool_refill(1)
+    entries = [name for name in os.listdir(keypool) if name.endswith(".json")]
+    assert len(entries) == 1
+    assert stat.S_IMODE(os.stat(keypool / entries[0]).st_mode) == 0o600
+    stored = json.loads((keypool / entries[0]).read_text())
+
+    keypair = keys.KeyPair.generate()
+
+    assert keypair.public_key == stored["public_key"]
+    assert keypair.private_key == stored["private_key"]
+    assert not [name for name in os.listdir(keypool) if name.endswith(".json")]
+
+def test_keypool_not_used_for_ed25519(keypool):
+    keys._keypool_refill(1)
+
+    keys.KeyPair.generate(algorithm="ed25519")
+
+    assert len([name for name in os.listdir(keypool) if name.endswith(".json")]) == 1
@@ -0,0 +1,52 @@
+"""Tests for the CLI's shared registry HTTP client."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from authed.cli.auth import CLIAuth
+from authed.cli.utils import http
+
+@pytest.fixture
+def recorded(monkeypatch):
+    """Replace the shared client with one that records requests."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"ok": True})
+
+    client = httpx.Client(
+        transport=httpx.MockTransport(handler),
+        headers={"User-Agent": "authed-cli/test"}
+    )
+    monkeypatch.setattr(http, "_session", client)
+    yield requests
+    client.close()
+
+def test_cli_auth_requests_use_the_shared_client(recorded):
+    auth = CLIAuth("https://registry.example/", "provider-1", "secret")
+
+    async def calls():
+        await auth.request("POST", "/agents/register", json={"name": "a"})
+        await auth.request("GET", "/agents/1", headers={"X-Extra": "1"})
+    asyncio.run(calls())
+    auth.list_agents()
+
+    assert [str(r.url) for r in recorded] == [
+        "https://registry.example/agents/register",
+        "https://registry.example/agents/1",
+        "https://registry.example/providers/list-agents/provider-1"
+    ]
+    assert all(r.headers["provider-secret"] == "secret" for r in recorded)
+    assert all(r.headers["User-Agent"] == "authed-cli/test" for r in recorded)
+    assert recorded[1].headers["X-Extra"] == "1"
+
+def test_get_session_returns_one_client(monkeypatch):
+    monkeypatch.setattr(http, "_session", None)
+    client = http.get_session()
+    try:
+        assert http.get_session() is client
+    finally:
+        client.close()
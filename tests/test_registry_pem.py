@@ -0,0 +1,53 @@
+"""Tests for public key PEM normalization used by interaction tokens."""
+
+import pytest
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, padding, rsa
+
+from registry.utils.pem import canonical_public_key_pem
+
+def public_pem(private_key) -> str:
+    return private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+
+def legacy_token_key(pem: str) -> str:
+    """The key as tokens issued before PEM storage carry it: the bare body."""
+    return "".join(pem.strip().splitlines()[1:-1])
+
+@pytest.fixture(params=["ed25519", "rsa"])
+def private_key(request):
+    if request.param == "ed25519":
+        return ed25519.Ed25519PrivateKey.generate()
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+def test_legacy_and_pem_keys_normalize_to_the_same_text(private_key):
+    pem = public_pem(private_key)
+    canonical = canonical_public_key_pem(pem)
+
+    assert canonical_public_key_pem(legacy_token_key(pem)) == canonical
+    assert canonical_public_key_pem(canonical) == canonical
+    assert canonical_public_key_pem(pem.replace("\n", "\r\n")) == canonical
+
+def test_legacy_token_key_verifies_signatures(private_key):
+    legacy = legacy_token_key(public_pem(private_key))
+    public_key = serialization.load_pem_public_key(canonical_public_key_pem(legacy).encode())
+
+    message = b"dpop proof signing input"
+    if isinstance(private_key, ed25519.Ed25519PrivateKey):
+        public_key.verify(private_key.sign(message), message)
+    else:
+        signature = private_key.sign(message, padding.PKCS1v15(), hashes.SHA256())
+        public_key.verify(signature, message, padding.PKCS1v15(), hashes.SHA256())
+
+def test_single_line_pem_is_rewrapped():
+    pem = public_pem(rsa.generate_private_key(public_exponent=65537, key_size=2048))
+    single_line = (
+        "-----BEGIN PUBLIC KEY-----\n"
+        + legacy_token_key(pem)
+        + "\n-----END PUBLIC KEY-----"
+    )
+
+    assert canonical_public_key_pem(single_line) == canonical_public_key_pem(pem)
+    assert all(len(line) <= 64 for line in canonical_public_key_pem(single_line).splitlines())
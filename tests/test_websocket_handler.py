@@ -0,0 +1,159 @@
+"""Tests for WebSocketHandler over real WebSocket connections."""
+
+import asyncio
+import json
+import warnings
+from contextlib import asynccontextmanager
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    from websockets.legacy.server import serve as legacy_serve
+
+from authed.sdk.channel.protocol import MessageType
+from authed.sdk.server.websocket import WebSocketHandler
+
+VALID_TOKEN = "valid-token"
+
+class FakeAuth:
+    """Token verifier that accepts only VALID_TOKEN."""
+
+    async def verify_token(self, token: str) -> bool:
+        return token == VALID_TOKEN
+
+class FakeSDK:
+    """Minimal stand-in for the Authed SDK instance."""
+
+    agent_id = "server-agent"
+
+    def __init__(self):
+        self.auth = FakeAuth()
+
+def make_message(content_type, data=None, message_id="msg-1", channel_id="channel-1"):
+    """Build a client message envelope."""
+    return json.dumps({
+        "meta": {
+            "message_id": message_id,
+            "sender_id": "client-agent",
+            "recipient_id": FakeSDK.agent_id,
+            "timestamp": "2025-01-01T00:00:00+00:00",
+            "sequence": 0,
+            "channel_id": channel_id
+        },
+        "content": {
+            "type": content_type,
+            "data": data or {}
+        }
+    })
+
+@asynccontextmanager
+async def legacy_server(handler):
+    """Serve `handler` with the legacy websockets server on a free port."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        server = await legacy_serve(handler.handle_connection, "127.0.0.1", 0)
+    try:
+        yield f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    finally:
+        server.close()
+        await server.wait_closed()
+
+def run(coro):
+    """Run a coroutine with a timeout so a hung connection fails the test."""
+    return asyncio.run(asyncio.wait_for(coro, timeout=10))
+
+def test_legacy_connection_round_trip():
+    handler = WebSocketHandler(FakeSDK())
+
+    async def echo(message):
+        return {"type": "echo.reply", "data": message["content"]["data"]}
+    handler.register_handler("echo", echo)
+
+    async def scenario():
+        async with legacy_server(handler) as uri:
+            headers = {"Authorization": f"Bearer {VALID_TOKEN}"}
+            async with connect(uri, additional_headers=headers) as ws:
+                await ws.send(make_message(MessageType.CHANNEL_OPEN, message_id="open-1"))
+                accept = json.loads(await ws.recv())
+                assert accept["content"]["type"] == MessageType.CHANNEL_ACCEPT
+                assert accept["meta"]["reply_to"] == "open-1"
+                assert accept["meta"]["sender"] == FakeSDK.agent_id
+
+                await ws.send(make_message("echo", {"value": 42}, message_id="echo-1"))
+                reply = json.loads(await ws.recv())
+                assert reply["content"] == {"type": "echo.reply", "data": {"value": 42}}
+                assert reply["meta"]["reply_to"] == "echo-1"
+                assert reply["meta"]["channel_id"] == "channel-1"
+
+    run(scenario())
+
+def test_legacy_connection_replies_in_text_frames():
+    handler = WebSocketHandler(FakeSDK())
+
+    async def scenario():
+        async with legacy_server(handler) as uri:
+            headers = {"Authorization": f"Bearer {VALID_TOKEN}"}
+            async with connect(uri, additional_headers=headers) as ws:
+                await ws.send(make_message(MessageType.HEARTBEAT))
+                reply = await ws.recv()
+                assert isinstance(reply, str)
+                assert json.loads(reply)["content"]["type"] == MessageType.HEARTBEAT
+
+    run(scenario())
+
+def test_queued_replies_are_sent_as_separate_messages():
+    handler = WebSocketHandler(FakeSDK())
+
+    async def scenario():
+        async with legacy_server(handler) as uri:
+            headers = {"Authorization": f"Bearer {VALID_TOKEN}"}
+            async with connect(uri, additional_headers=headers) as ws:
+                # Send without waiting, so replies queue up behind the writer
+                await ws.send(make_message(MessageType.CHANNEL_OPEN, message_id="open-1"))
+                for i in range(5):
+                    await ws.send(make_message(MessageType.HEARTBEAT, message_id=f"beat-{i}"))
+
+                replies = [json.loads(await ws.recv()) for _ in range(6)]
+                assert all(isinstance(reply, dict) for reply in replies)
+                assert [reply["meta"]["reply_to"] for reply in replies] == (
+                    ["open-1"] + [f"beat-{i}" for i in range(5)]
+                )
+
+    run(scenario())
+
+def test_invalid_token_is_closed_without_waiting_for_a_message():
+    handler = WebSocketHandler(FakeSDK())
+
+    async def scenario():
+        async with legacy_server(handler) as uri:
+            headers = {"Authorization": "Bearer invalid-token"}
+            async with connect(uri, additional_headers=headers) as ws:
+                await asyncio.wait_for(ws.wait_closed(), timeout=2)
+                assert ws.close_code == 1008
+                assert ws.close_reason == "Invalid authentication"
+
+    run(scenario())
+
+def test_invalid_token_message_is_not_handled():
+    handler = WebSocketHandler(FakeSDK())
+    handled = []
+
+    async def record(message):
+        handled.append(message)
+    handler.register_handler("record", record)
+
+    async def scenario():
+        async with legacy_server(handler) as uri:
+            headers = {"Authorization": "Bearer invalid-token"}
+            async with connect(uri, additional_headers=headers) as ws:
+                try:
+                    await ws.send(make_message("record"))
+                except ConnectionClosed:
+                    pass
+                await asyncio.wait_for(ws.wait_closed(), timeout=2)
+                assert ws.close_code == 1008
+
+    run(scenario())
+    assert handled == []